@@ -3,7 +3,7 @@ Async Request Manager for handling large batch operations efficiently.
 """
 
 import asyncio
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 from .request_manager import RequestManager
 
@@ -11,6 +11,82 @@ from .request_manager import RequestManager
 class AsyncRequestManager(RequestManager):
     """Async version of RequestManager for batch operations."""
     
+    async def _run_batch(
+        self,
+        request_ids: List[int],
+        run_chunk: Callable[[List[int]], Dict[int, Dict[str, object]]],
+        max_concurrent: int,
+        label: str,
+        show_progress: bool,
+        chunk_size: int = 1
+    ) -> Dict[int, Dict[str, object]]:
+        """
+        Run a sync request operation over a queue drained by a fixed pool of workers.
+        
+        Only max_concurrent operations (and worker tasks) exist at any time, and each
+        completion is reported as it happens rather than after the whole batch.
+        
+        Args:
+            request_ids: List of request IDs
+            run_chunk: Sync function returning results for a list of request IDs
+            max_concurrent: Number of workers
+            label: Operation name used in progress messages
+            show_progress: Whether to show progress
+            chunk_size: Request IDs handed to each run_chunk call
+            
+        Returns:
+            Dictionary mapping request_id to results
+        """
+        loop = asyncio.get_event_loop()
+        queue: "asyncio.Queue[List[int]]" = asyncio.Queue()
+        chunk_size = max(1, chunk_size)
+        for i in range(0, len(request_ids), chunk_size):
+            queue.put_nowait(request_ids[i:i + chunk_size])
+        
+        total = len(request_ids)
+        final_results: Dict[int, Dict[str, object]] = {}
+        done = 0
+        success_count = 0
+        
+        async def worker() -> None:
+            nonlocal done, success_count
+            while True:
+                try:
+                    chunk = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    # Run the sync operation in a thread pool
+                    results = await loop.run_in_executor(None, run_chunk, chunk)
+                except Exception as e:
+                    # Every request in a failed chunk still gets a result
+                    print(f"Error in batch {label}: {e}")
+                    results = {req_id: {"success": False, "message": str(e)} for req_id in chunk}
+                try:
+                    for req_id in chunk:
+                        result = results.get(req_id, {"success": False, "message": "Unknown error"})
+                        final_results[req_id] = result
+                        done += 1
+                        if result.get("success"):
+                            success_count += 1
+                        if show_progress:
+                            status = "OK" if result.get("success") else "FAILED"
+                            print(f"[{done}/{total}] RequestID {req_id}: {status}")
+                finally:
+                    queue.task_done()
+        
+        if show_progress:
+            print(f"Starting batch {label} of {total} requests with max {max_concurrent} concurrent...")
+        
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(max_concurrent, queue.qsize()))]
+        await queue.join()
+        await asyncio.gather(*workers)
+        
+        if show_progress:
+            print(f"Batch {label} complete: {success_count}/{total} successful")
+        
+        return final_results
+    
     async def download_files_batch(
         self, 
         request_ids: List[int], 
@@ -30,50 +106,20 @@ class AsyncRequestManager(RequestManager):
         Returns:
             Dictionary mapping request_id to download results
         """
-        semaphore = asyncio.Semaphore(max_concurrent)
-        
-        async def download_single(req_id: int) -> tuple:
-            async with semaphore:
-                # Run the sync download in a thread pool
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None, 
-                    lambda: self.download_files([req_id], local_dir, show_progress=False)
-                )
-                return req_id, result[req_id] if req_id in result else {"success": False, "message": "Unknown error"}
+        def download_chunk(chunk: List[int]) -> Dict[int, Dict[str, object]]:
+            return self.download_files(chunk, local_dir, show_progress=False)
         
-        if show_progress:
-            print(f"Starting batch download of {len(request_ids)} requests with max {max_concurrent} concurrent...")
-        
-        # Execute all downloads concurrently
-        tasks = [download_single(req_id) for req_id in request_ids]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        final_results = {}
-        success_count = 0
-        
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"Error in batch download: {result}")
-                continue
-            
-            req_id, download_result = result
-            final_results[req_id] = download_result
-            if download_result.get("success"):
-                success_count += 1
-        
-        if show_progress:
-            print(f"Batch download complete: {success_count}/{len(request_ids)} successful")
-        
-        return final_results
+        return await self._run_batch(
+            request_ids, download_chunk, max_concurrent, "download", show_progress
+        )
     
     async def restore_files_batch(
         self,
         request_ids: List[int],
         temp_dir: str = "/tmp",
         max_concurrent: int = 3,
-        show_progress: bool = True
+        show_progress: bool = True,
+        chunk_size: int = 1
     ) -> Dict[int, Dict[str, object]]:
         """
         Restore files for multiple requests concurrently.
@@ -83,47 +129,18 @@ class AsyncRequestManager(RequestManager):
             temp_dir: Temporary directory for processing
             max_concurrent: Maximum concurrent restores (lower due to SFTP limitations)
             show_progress: Whether to show progress
+            chunk_size: Requests restored per call, sharing one SFTP connection and DB session
             
         Returns:
             Dictionary mapping request_id to restore results
         """
-        semaphore = asyncio.Semaphore(max_concurrent)
-        
-        async def restore_single(req_id: int) -> tuple:
-            async with semaphore:
-                # Run the sync restore in a thread pool
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None, 
-                    lambda: self.restore_files([req_id], temp_dir, show_progress=False)
-                )
-                return req_id, result[req_id] if req_id in result else {"success": False, "message": "Unknown error"}
+        def restore_chunk(chunk: List[int]) -> Dict[int, Dict[str, object]]:
+            return self.restore_files(chunk, temp_dir, show_progress=False)
         
-        if show_progress:
-            print(f"Starting batch restore of {len(request_ids)} requests with max {max_concurrent} concurrent...")
-        
-        # Execute all restores concurrently
-        tasks = [restore_single(req_id) for req_id in request_ids]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        final_results = {}
-        success_count = 0
-        
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"Error in batch restore: {result}")
-                continue
-            
-            req_id, restore_result = result
-            final_results[req_id] = restore_result
-            if restore_result.get("success"):
-                success_count += 1
-        
-        if show_progress:
-            print(f"Batch restore complete: {success_count}/{len(request_ids)} successful")
-        
-        return final_results
+        return await self._run_batch(
+            request_ids, restore_chunk, max_concurrent, "restore", show_progress,
+            chunk_size=chunk_size
+        )
     
     async def batch_rerun_by_district(
         self,
@@ -2,14 +2,18 @@
 Database management utilities with connection handling and query helpers.
 """
 
+import threading
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
+from functools import cached_property
 from typing import Dict, List, Optional, Sequence, Tuple
 import pytz
 
 from sqlalchemy import create_engine, func, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from integration_tools.models import DataRequestType, Request, RequestEmailNotification, XpsDistrictUpload
@@ -52,15 +56,31 @@ class RequestRow:
     RequestTime: Optional[datetime]
     RequestTimeEST: Optional[datetime] = None
 
+    @cached_property
+    def request_time_iso(self) -> Optional[str]:
+        """RequestTime as an ISO 8601 string, formatted once per row."""
+        return self.RequestTime.isoformat() if self.RequestTime else None
+
+    @cached_property
+    def request_time_est_iso(self) -> Optional[str]:
+        """RequestTimeEST as an ISO 8601 string, formatted once per row."""
+        return self.RequestTimeEST.isoformat() if self.RequestTimeEST else None
+
 
 class DatabaseManager:
     """Manages database connections and provides query utilities."""
     
-    def __init__(self, server: str = "10.252.24.190", database: str = "AdminReporting"):
+    def __init__(
+        self,
+        server: str = "10.252.24.190",
+        database: str = "AdminReporting",
+        pool_size: int = 8
+    ):
         self.server = server
         self.database = database
-        self._engine = None
-        self._session_factory = None
+        self.pool_size = pool_size
+        self._engines: Dict[Tuple[str, str], Engine] = {}
+        self._engines_lock = threading.Lock()
     
     def _get_connection_string(self, username: str, password: str) -> str:
         """Build SQL Server connection string."""
@@ -74,6 +94,64 @@ class DatabaseManager:
         )
         return f"mssql+pyodbc:///?odbc_connect={params}"
     
+    def _get_engine(self, username: str, password: str) -> Engine:
+        """
+        Get the engine for the given credentials, creating it on first use.
+        
+        Engines (and their connection pools) are cached per credential pair,
+        so repeated sessions reuse pooled connections instead of reconnecting.
+        
+        Args:
+            username: Database username
+            password: Database password
+            
+        Returns:
+            SQLAlchemy engine bound to this server and database
+        """
+        key = (username, password)
+        with self._engines_lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = create_engine(
+                    self._get_connection_string(username, password),
+                    pool_size=self.pool_size,
+                    pool_pre_ping=True
+                )
+                self._engines[key] = engine
+        return engine
+    
+    def warm_pool(self, username: str, password: str, connections: int) -> int:
+        """
+        Open pooled connections ahead of a burst of parallel queries.
+        
+        Connections are opened concurrently and returned to the pool idle, so the
+        queries that follow check them out instead of each connecting on first use.
+        
+        Args:
+            username: Database username
+            password: Database password
+            connections: Number of connections to open (capped at pool_size)
+            
+        Returns:
+            Number of connections opened
+        """
+        engine = self._get_engine(username, password)
+        connections = min(connections, self.pool_size)
+        if connections < 1:
+            return 0
+        
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            futures = [executor.submit(engine.connect) for _ in range(connections)]
+        
+        opened = [f.result() for f in futures if f.exception() is None]
+        for conn in opened:
+            conn.close()
+        
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            raise errors[0]
+        return len(opened)
+    
     @contextmanager
     def get_session(self, username: str, password: str):
         """
@@ -86,11 +164,8 @@ class DatabaseManager:
         Yields:
             Database session
         """
-        conn_str = self._get_connection_string(username, password)
-        engine = create_engine(conn_str)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        
-        session = SessionLocal()
+        engine = self._get_engine(username, password)
+        session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
         try:
             yield session
         finally:
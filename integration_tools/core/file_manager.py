@@ -4,11 +4,14 @@ File management utilities for SFTP operations and local file handling.
 
 import os
 import shutil
+import stat
 import tarfile
 import tempfile
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
-import paramiko
+if TYPE_CHECKING:
+    # paramiko (and the cryptography stack under it) is imported on first connection
+    import paramiko
 
 try:
     import zstandard as zstd
@@ -20,10 +23,10 @@ class FileManager:
     """Manages SFTP connections and file operations."""
     
     def __init__(self):
-        self._sftp_client: Optional[paramiko.SFTPClient] = None
-        self._ssh_client: Optional[paramiko.SSHClient] = None
+        self._sftp_client: Optional["paramiko.SFTPClient"] = None
+        self._ssh_client: Optional["paramiko.SSHClient"] = None
     
-    def create_sftp_connection(self, host: str, username: str, password: str) -> paramiko.SFTPClient:
+    def create_sftp_connection(self, host: str, username: str, password: str) -> "paramiko.SFTPClient":
         """
         Create SFTP connection using paramiko.
         
@@ -38,6 +41,8 @@ class FileManager:
         Raises:
             Exception: If connection fails
         """
+        import paramiko
+        
         try:
             self._ssh_client = paramiko.SSHClient()
             self._ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -111,7 +116,7 @@ class FileManager:
 
         return f"/{p}" if p else "/"
     
-    def ensure_remote_directory_exists(self, sftp: paramiko.SFTPClient, remote_path: str) -> bool:
+    def ensure_remote_directory_exists(self, sftp: "paramiko.SFTPClient", remote_path: str) -> bool:
         """
         Ensure remote directory exists, creating it if necessary.
         
@@ -149,7 +154,7 @@ class FileManager:
     
     def download_requestid_raw_files(
         self, 
-        sftp: paramiko.SFTPClient, 
+        sftp: "paramiko.SFTPClient", 
         request_id: int, 
         local_dir: str
     ) -> Tuple[bool, int, str]:
@@ -167,22 +172,23 @@ class FileManager:
         remote_dir = "LinkIt/ETLProcessedFolder/001"
         
         try:
-            files = sftp.listdir(remote_dir)
+            # listdir_attr returns each entry's mode with the listing, so no per-entry stat
+            entries = sftp.listdir_attr(remote_dir)
         except Exception as e:
             return False, 0, f"Error listing {remote_dir}: {str(e)}"
 
         # Find the directory that starts with request_id
-        match_dir = None
-        for f in files:
-            if f.startswith(str(request_id)):
-                try:
-                    # Check if it's a directory
-                    stat_result = sftp.stat(f"{remote_dir}/{f}")
-                    if stat_result and stat_result.st_mode is not None and (stat_result.st_mode & 0o40000):
-                        match_dir = f
-                        break
-                except Exception:
-                    continue
+        rid = str(request_id)
+        match_dir = next(
+            (
+                entry.filename
+                for entry in entries
+                if entry.filename.startswith(rid)
+                and entry.st_mode is not None
+                and stat.S_ISDIR(entry.st_mode)
+            ),
+            None,
+        )
         
         if not match_dir:
             return False, 0, f"No directory found starting with {request_id} in {remote_dir}"
@@ -223,7 +229,7 @@ class FileManager:
     
     def download_requestid_backup_file(
         self, 
-        sftp: paramiko.SFTPClient, 
+        sftp: "paramiko.SFTPClient", 
         request_id: int, 
         local_dir: str
     ) -> Tuple[bool, int, str]:
@@ -248,11 +254,8 @@ class FileManager:
             return False, 0, f"Error listing {remote_dir}: {str(e)}"
 
         # Find the file
-        match = None
-        for f in files:
-            if f.startswith(str(request_id)) and f.endswith(".tar.zst"):
-                match = f
-                break
+        rid = str(request_id)
+        match = next((f for f in files if f.startswith(rid) and f.endswith(".tar.zst")), None)
         
         if not match:
             return False, 0, f"No .tar.zst file found for {request_id} in {remote_dir}"
@@ -267,36 +270,25 @@ class FileManager:
         except Exception as e:
             return False, 0, f"Failed to prepare working tmp dir '{work_dir}': {str(e)}"
 
-        local_zst = os.path.join(work_dir, match)
-        local_tar = local_zst[:-4]  # remove .zst
-
-        # Download
-        try:
-            sftp.get(remote_path, local_zst)
-        except Exception as e:
-            return False, 0, f"Failed to download {remote_path}: {str(e)}"
-
-        # Decompress .zst to .tar
-        try:
-            with open(local_zst, "rb") as compressed, open(local_tar, "wb") as out:
-                dctx = zstd.ZstdDecompressor()
-                dctx.copy_stream(compressed, out)
-        except Exception as e:
-            return False, 0, f"Failed to decompress {local_zst}: {str(e)}"
-
-        # Extract .csv from .tar
+        # Download, decompress and untar in one pass: the prefetched SFTP file feeds the zstd
+        # stream reader, which feeds a streaming tar reader ("r|"), so the network transfer
+        # overlaps decompression and neither the .zst nor the .tar is written locally
         csv_files = []
         try:
-            with tarfile.open(local_tar, "r") as tar:
-                for member in tar.getmembers():
-                    if member.name.endswith(".csv"):
-                        tar.extract(member, path=work_dir)
-                        csv_files.append(os.path.join(work_dir, member.name))
+            with sftp.open(remote_path, "rb", bufsize=1 << 20) as remote:
+                remote.prefetch()
+                dctx = zstd.ZstdDecompressor(max_window_size=1 << 27)
+                with dctx.stream_reader(remote, read_size=1 << 20) as reader:
+                    with tarfile.open(fileobj=reader, mode="r|") as tar:
+                        for member in tar:
+                            if member.isfile() and member.name.endswith(".csv"):
+                                tar.extract(member, path=work_dir)
+                                csv_files.append(os.path.join(work_dir, member.name))
         except Exception as e:
-            return False, 0, f"Failed to extract .tar: {str(e)}"
+            return False, 0, f"Failed to download and extract {remote_path}: {str(e)}"
 
         if not csv_files:
-            return False, 0, f"No .csv files found in {local_tar}"
+            return False, 0, f"No .csv files found in {match}"
 
         # Move CSVs to local_dir
         files_downloaded = 0
@@ -311,18 +303,8 @@ class FileManager:
             except Exception as e:
                 errors.append(f"Failed to move {filename}: {str(e)}")
 
-        # Cleanup temporary files
-        for f in [local_zst, local_tar]:
-            try:
-                os.remove(f)
-            except Exception:
-                pass
-
         # Remove temporary directory
-        try:
-            shutil.rmtree(work_dir, ignore_errors=True)
-        except Exception:
-            pass
+        shutil.rmtree(work_dir, ignore_errors=True)
 
         if errors:
             return False, files_downloaded, f"Completed with errors: {'; '.join(errors)}"
@@ -330,7 +312,7 @@ class FileManager:
     
     def download_files_for_requests(
         self,
-        sftp: paramiko.SFTPClient,
+        sftp: "paramiko.SFTPClient",
         request_ids: List[int],
         local_download_dir: str = "~/Downloads",
         progress_callback: Optional[Callable[[int, int, int, bool, int, str], None]] = None,
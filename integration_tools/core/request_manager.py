@@ -98,6 +98,16 @@ class RequestManager:
         self._cached_sftp_credentials = creds
         return creds
     
+    def warm_db_pool(self, connections: int) -> None:
+        """
+        Resolve DB credentials and pre-open pooled connections for parallel queries.
+        
+        Args:
+            connections: Number of connections the upcoming queries will use
+        """
+        username, password = self.get_db_credentials()
+        self.db_manager.warm_pool(username, password, connections)
+    
     def list_request_types(self, name_filter: Optional[str] = None) -> List[tuple]:
         """
         List all DataRequestTypes with optional filtering.
@@ -204,7 +214,9 @@ class RequestManager:
         """
         host, username, password = self.get_sftp_credentials()
         
-        with self.file_manager as fm:
+        # A FileManager holds a single connection, and download_files_batch calls this from
+        # several threads at once, so each call connects through its own FileManager
+        with FileManager() as fm:
             sftp = fm.create_sftp_connection(host, username, password)
             
             def progress_callback(done: int, total: int, req_id: int, ok: bool, count: int, msg: str):
@@ -252,7 +264,9 @@ class RequestManager:
         # Import the restore functions (keeping existing functionality)
         from ..legacy.restore_etl_proccessed import restore_for_requestids
         
-        with self.file_manager as fm:
+        # Own FileManager per call, as in download_files: restore_files_batch runs this
+        # from several threads, and a shared one would swap and close their connections
+        with FileManager() as fm:
             sftp = fm.create_sftp_connection(host, sftp_user, sftp_pwd)
             
             def progress_callback(done: int, total: int, req_id: int, ok: bool, count: int, msg: str):
@@ -1,15 +1,204 @@
+import logging
 import paramiko
 import os
+import socket
+import stat
 import zstandard as zstd
 import tarfile
 import tempfile
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+log = logging.getLogger(__name__)
+
+# Calls running with mute_output=True flag their thread here; _MuteFilter drops those records
+_muted = threading.local()
+
+
+class _MuteFilter(logging.Filter):
+    """Drop records logged from a thread inside a muted restore_for_requestids call."""
+
+    def filter(self, record):
+        return not getattr(_muted, "active", False)
+
+
+log.addFilter(_MuteFilter())
+log.addHandler(logging.NullHandler())
+
+# Open SFTP sessions keyed by (hostname, username), reused across process_requestids calls
+_sftp_pool = {}
+_sftp_pool_lock = threading.Lock()
+
+# Worker threads per transfer. Each opens its own SFTP session on the shared transport, and
+# with the caller's session this stays under OpenSSH's default MaxSessions of 10.
+_MAX_SFTP_WORKERS = 7
+
+# Archive members up to this size are buffered in memory so they can be uploaded in parallel
+_MAX_BUFFERED_MEMBER_SIZE = 8 * 1024 * 1024
+
+# Total bytes of buffered members one restore holds at a time, so several restores running
+# side by side (restore_files_batch) stay within a few hundred MiB between them
+_MAX_BUFFERED_BYTES = 32 * 1024 * 1024
+
+# Compressed bytes pulled from the SFTP file per zstd read; matches the 1 MiB SFTP buffer
+_ZSTD_READ_SIZE = 1 << 20
+
+# Decompression contexts are reused across requests; restores may run in executor threads,
+# so each thread gets its own decompressor.
+_dctx_local = threading.local()
+
+
+def _get_dctx():
+    """Return this thread's shared ZstdDecompressor, creating it on first use."""
+    dctx = getattr(_dctx_local, "dctx", None)
+    if dctx is None:
+        dctx = zstd.ZstdDecompressor(max_window_size=1 << 27)
+        _dctx_local.dctx = dctx
+    return dctx
+
+
+def _safe_listdir_attr(sftp_client, path):
+    """Return listdir_attr(path), or an empty list if the directory can't be listed."""
+    try:
+        return sftp_client.listdir_attr(path)
+    except Exception:
+        return []
+
+
+def _get_transport(sftp_client):
+    """Return the SSH transport behind sftp_client, or None if it can't be determined."""
+    try:
+        return sftp_client.get_channel().get_transport()
+    except Exception:
+        return None
+
+
+class _WorkerChannels:
+    """
+    Hands each worker thread its own SFTPClient channel on a shared SSH transport, since a
+    single SFTPClient can't serve requests from two threads at once. Without a transport,
+    or once the server refuses another session, threads take turns on the fallback client
+    under shared_lock; anything else using the fallback client concurrently must hold it too.
+    """
+
+    def __init__(self, sftp_client):
+        self.fallback = sftp_client
+        self.transport = _get_transport(sftp_client)
+        self.shared_lock = threading.RLock()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._clients = []
+        self._exhausted = False
+
+    def _channel(self):
+        """This thread's own SFTPClient, or None if it has to share the fallback client."""
+        client = getattr(self._local, "client", None)
+        if client is not None or self.transport is None or self._exhausted:
+            return client
+        try:
+            client = paramiko.SFTPClient.from_transport(self.transport)
+        except Exception as e:
+            # Typically the server's MaxSessions limit; later threads shouldn't retry
+            self._exhausted = True
+            log.debug(f"Could not open another SFTP channel, sharing the main one: {e}")
+            return None
+        self._local.client = client
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    @contextmanager
+    def client(self):
+        """Yield an SFTPClient this thread may use until the block exits."""
+        client = self._channel()
+        if client is not None:
+            yield client
+        else:
+            with self.shared_lock:
+                yield self.fallback
+
+    def close(self):
+        for client in self._clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+        self._clients = []
+
+
+class _ByteBudget:
+    """Blocks acquire() until the requested bytes fit under limit alongside those already held."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size):
+        with self._cond:
+            self._cond.wait_for(lambda: self._used + size <= self.limit)
+            self._used += size
+
+    def release(self, size):
+        with self._cond:
+            self._used -= size
+            self._cond.notify_all()
+
+
+class _LockedReader:
+    """File wrapper whose reads hold lock, so other threads can share the underlying SFTPClient."""
+
+    def __init__(self, fh, lock):
+        self._fh = fh
+        self._lock = lock
+
+    def read(self, size=-1):
+        with self._lock:
+            return self._fh.read(size)
+
+
+def _ensure_remote_dir(sftp_client, path):
+    """Create path on the server unless a single stat shows it already exists."""
+    try:
+        sftp_client.stat(path)
+    except IOError:
+        sftp_client.mkdir(path)
+
+
+def _sftp_copy(sftp_client, remote_source, remote_dest, size=None):
+    """
+    Copy a file between two paths on the same SFTP server by streaming it through memory
+    in 1 MiB chunks, with read-ahead on the source and pipelined writes on the destination.
+    Pass size when it is already known to save prefetch() a stat round-trip.
+    """
+    with sftp_client.open(remote_source, "rb", bufsize=1 << 20) as src:
+        src.prefetch(size)
+        with sftp_client.open(remote_dest, "wb", bufsize=1 << 20) as dst:
+            dst.set_pipelined(True)
+            shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def _find_first_entry(sftp_client, remote_dirs, matches):
+    """
+    Return (dir_path, entry) for the first entry satisfying matches, searching remote_dirs
+    in order and listing a directory only when the ones before it had no match.
+    Directories that can't be listed are skipped. Returns (None, None) if nothing matches.
+    """
+    for dir_path in remote_dirs:
+        for entry in _safe_listdir_attr(sftp_client, dir_path):
+            if matches(entry):
+                return dir_path, entry
+    return None, None
 
 
 def process_requestid_raw_files(sftp_client, request_id, target_dir, local_tmp_dir="tmp"):
     """
     For a given request_id, find the directory starting with request_id in /ETLProcessedFolder/001, 
-    download all CSV files from that directory, and move them to target_dir.
+    and copy all CSV/TXT files from that directory to target_dir server-side.
+    local_tmp_dir is accepted for compatibility but no longer used.
     """
     # Try main ETLProcessedFolder first, then fallback to BackupData
     remote_dirs = [
@@ -17,96 +206,78 @@ def process_requestid_raw_files(sftp_client, request_id, target_dir, local_tmp_d
         "LinkIt/BackupData/ETLProcessedFolder/001"
     ]
     
-    match_dir = None
-    remote_dir = None
-    
-    for dir_path in remote_dirs:
-        try:
-            files = sftp_client.listdir(dir_path)
-            for f in files:
-                if f.startswith(str(request_id)):
-                    try:
-                        # Check if it's a directory
-                        if sftp_client.stat(f"{dir_path}/{f}").st_mode & 0o40000:
-                            match_dir = f
-                            remote_dir = dir_path
-                            break
-                    except Exception:
-                        continue
-            if match_dir:
-                break
-        except Exception as e:
-            continue  # Try next directory
+    prefix = str(request_id)
+    remote_dir, entry = _find_first_entry(
+        sftp_client,
+        remote_dirs,
+        lambda e: e.filename.startswith(prefix) and e.st_mode is not None and stat.S_ISDIR(e.st_mode)
+    )
     
-    if not match_dir:
+    if entry is None:
         return False, 0, f"No directory found starting with {request_id} in ETLProcessedFolder or BackupData locations"
-    else:
-        print(f"Found directory: {match_dir} in {remote_dir}")
+    match_dir = entry.filename
+    log.info(f"Found directory: {match_dir} in {remote_dir}")
 
     remote_folder_path = f"{remote_dir}/{match_dir}"
     
-    # List all files in the matched directory
+    # List all files in the matched directory, keeping sizes for the copy prefetch
     try:
-        folder_files = sftp_client.listdir(remote_folder_path)
+        folder_entries = sftp_client.listdir_attr(remote_folder_path)
     except Exception as e:
         return False, 0, f"Error listing {remote_folder_path}: {str(e)}"
 
     # Filter for CSV and TXT files
-    data_files = [f for f in folder_files if f.endswith('.csv') or f.endswith('.txt')]
+    data_files = [
+        (entry.filename, entry.st_size)
+        for entry in folder_entries
+        if entry.filename.endswith('.csv') or entry.filename.endswith('.txt')
+    ]
     
     if not data_files:
         return False, 0, f"No CSV or TXT files found in {remote_folder_path}"
 
     # Ensure target_dir exists
     try:
-        sftp_client.listdir(target_dir)
-    except FileNotFoundError:
-        try:
-            sftp_client.mkdir(target_dir)
-        except Exception as e:
-            return False, 0, f"Failed to create target directory {target_dir}: {str(e)}"
-
-    # Ensure local temp dir exists
-    created_tmp_dir = False
-    try:
-        if not os.path.isdir(local_tmp_dir):
-            os.makedirs(local_tmp_dir, exist_ok=True)
-            created_tmp_dir = True
+        _ensure_remote_dir(sftp_client, target_dir)
     except Exception as e:
-        return False, 0, f"Failed to prepare local tmp dir '{local_tmp_dir}': {str(e)}"
+        return False, 0, f"Failed to create target directory {target_dir}: {str(e)}"
 
-    # Move data files to target_dir
+    # Move data files to target_dir. Transfers are latency-bound, so they run on a thread
+    # pool; SFTPClient isn't safe to share between threads, so each worker opens its own
+    # SFTP channel on the existing transport.
     files_moved = 0
     errors = []
-    
-    for data_file in data_files:
-        remote_source = f"{remote_folder_path}/{data_file}"
-        remote_dest = f"{target_dir}/{data_file}"
-        
+    lock = threading.Lock()
+    channels = _WorkerChannels(sftp_client)
+    max_workers = min(_MAX_SFTP_WORKERS, len(data_files)) if channels.transport is not None else 1
+    move_jobs = [
+        (data_file, size, f"{remote_folder_path}/{data_file}", f"{target_dir}/{data_file}")
+        for data_file, size in data_files
+    ]
+
+    def move(job):
+        nonlocal files_moved
+        data_file, size, remote_source, remote_dest = job
         try:
-            # Download to local temp first, then upload to target
-            local_temp = os.path.join(local_tmp_dir, data_file)
-            sftp_client.get(remote_source, local_temp)
-            sftp_client.put(local_temp, remote_dest)
-            
-            # Clean up local temp file
-            try:
-                os.remove(local_temp)
-            except Exception:
-                pass
-                
-            files_moved += 1
-            print(f"✓ Moved {data_file} for RequestID {request_id}")
+            with channels.client() as client:
+                _sftp_copy(client, remote_source, remote_dest, size)
+            with lock:
+                files_moved += 1
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"✓ Moved {data_file} for RequestID {request_id}")
         except Exception as e:
-            errors.append(f"Failed to move {data_file}: {str(e)}")
+            with lock:
+                errors.append(f"Failed to move {data_file}: {str(e)}")
 
-    # Attempt to cleanup temp dir if we created it and it's empty
-    if created_tmp_dir:
-        try:
-            if not os.listdir(local_tmp_dir):
-                os.rmdir(local_tmp_dir)
-        except Exception:
-            pass
+    try:
+        if max_workers == 1:
+            for job in move_jobs:
+                move(job)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                list(ex.map(move, move_jobs))
+    finally:
+        channels.close()
 
     if errors:
         return False, files_moved, f"Completed with errors: {'; '.join(errors)}"
@@ -116,7 +287,8 @@ def process_requestid_raw_files(sftp_client, request_id, target_dir, local_tmp_d
 def process_requestid_file(sftp_client, request_id, target_dir, local_tmp_dir="tmp"):  # new function
     """
     For a given request_id, find the .tar.zst file in /BackupData/ETLProcessedFolder/001 or /ETLProcessedFolder/001, 
-    download, decompress, extract CSV, and move to target_dir.
+    then stream-decompress it and write each archived file directly into target_dir.
+    local_tmp_dir is accepted for compatibility but no longer used.
     """
     # Try BackupData first, then fallback to main ETLProcessedFolder
     remote_dirs = [
@@ -124,158 +296,193 @@ def process_requestid_file(sftp_client, request_id, target_dir, local_tmp_dir="t
         "LinkIt/ETLProcessedFolder/001"
     ]
     
-    match = None
-    remote_dir = None
+    prefix = str(request_id)
+    sfx = ".tar.zst"
+    remote_dir, entry = _find_first_entry(
+        sftp_client, remote_dirs, lambda e: e.filename.startswith(prefix) and e.filename.endswith(sfx)
+    )
     
-    for dir_path in remote_dirs:
-        try:
-            files = sftp_client.listdir(dir_path)
-            for f in files:
-                if f.startswith(str(request_id)) and f.endswith(".tar.zst"):
-                    match = f
-                    remote_dir = dir_path
-                    break
-            if match:
-                break
-        except Exception as e:
-            continue  # Try next directory
-    
-    if not match:
+    if entry is None:
         return False, 0, f"No .tar.zst file found for {request_id} in BackupData or ETLProcessedFolder locations"
-    else: 
-        print(f"Found {match} in {remote_dir}")
+    match = entry.filename
+    match_size = entry.st_size
+    log.info(f"Found {match} in {remote_dir}")
 
     remote_path = f"{remote_dir}/{match}"
 
-    # Ensure base temp dir exists and create a per-request working subdir
+    # Ensure target_dir exists
     try:
-        os.makedirs(local_tmp_dir, exist_ok=True)
+        _ensure_remote_dir(sftp_client, target_dir)
     except Exception as e:
-        return False, 0, f"Failed to prepare base tmp dir '{local_tmp_dir}': {str(e)}"
+        return False, 0, f"Failed to create target directory {target_dir}: {str(e)}"
 
-    work_dir = os.path.join(local_tmp_dir, f"req_{request_id}")
-    try:
-        os.makedirs(work_dir, exist_ok=True)
-    except Exception as e:
-        return False, 0, f"Failed to prepare working tmp dir '{work_dir}': {str(e)}"
+    # Stream the archive straight off the SFTP server and write each member straight back
+    # to target_dir, so nothing touches local disk. The zstd stream_reader does its own
+    # buffering, so hand the SFTP file to it directly and read the tar in stream mode ("r|").
+    # The tar can only be read sequentially, so uploads are parallelised by buffering small
+    # members in memory (up to _MAX_BUFFERED_BYTES in flight) and writing them from a thread pool,
+    # each worker on its own SFTP channel. Large members are streamed inline.
+    files_moved = 0
+    errors = []
+    lock = threading.Lock()
+    channels = _WorkerChannels(sftp_client)
+    max_workers = _MAX_SFTP_WORKERS if channels.transport is not None else 1
+    in_flight = _ByteBudget(_MAX_BUFFERED_BYTES)
 
-    local_zst = os.path.join(work_dir, match)
-    local_tar = local_zst[:-4]  # remove .zst
+    def record(filename, error=None):
+        nonlocal files_moved
+        with lock:
+            if error is None:
+                files_moved += 1
+            else:
+                errors.append(f"Failed to upload {filename}: {str(error)}")
+        if error is None and log.isEnabledFor(logging.DEBUG):
+            log.debug(f"✓ Uploaded {filename} for RequestID {request_id}")
 
-    # Download
-    try:
-        sftp_client.get(remote_path, local_zst)
-    except Exception as e:
-        return False, 0, f"Failed to download {remote_path}: {str(e)}"
+    def upload_buffered(filename, remote_dest, data, reserved):
+        try:
+            with channels.client() as client:
+                with client.open(remote_dest, "wb", bufsize=1 << 20) as wfh:
+                    wfh.set_pipelined(True)
+                    wfh.write(data)
+            record(filename)
+        except Exception as e:
+            record(filename, e)
+        finally:
+            in_flight.release(reserved)
 
-    # Decompress .zst to .tar
     try:
-        with open(local_zst, "rb") as compressed, open(local_tar, "wb") as out:
-            dctx = zstd.ZstdDecompressor()
-            dctx.copy_stream(compressed, out)
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            with sftp_client.open(remote_path, "rb", bufsize=1 << 20) as fh:
+                # The listing already carries the size, so prefetch needn't stat the file again
+                fh.prefetch(match_size)
+                # Workers may fall back to sftp_client, so archive reads take their turn too
+                reader = _LockedReader(fh, channels.shared_lock)
+                with _get_dctx().stream_reader(reader, read_size=_ZSTD_READ_SIZE) as zr:
+                    with tarfile.open(fileobj=zr, mode="r|") as tar:
+                        for member in tar:
+                            if not member.isfile():  # Only upload regular files
+                                continue
+                            filename = os.path.basename(member.name)
+                            remote_dest = f"{target_dir}/{filename}"
+                            src = tar.extractfile(member)
+                            if max_workers > 1 and member.size <= _MAX_BUFFERED_MEMBER_SIZE:
+                                in_flight.acquire(member.size)
+                                try:
+                                    data = src.read()
+                                except Exception:
+                                    in_flight.release(member.size)
+                                    raise
+                                ex.submit(upload_buffered, filename, remote_dest, data, member.size)
+                                continue
+                            try:
+                                with channels.shared_lock:
+                                    with sftp_client.open(remote_dest, "wb", bufsize=1 << 20) as wfh:
+                                        wfh.set_pipelined(True)
+                                        shutil.copyfileobj(src, wfh, length=1 << 20)
+                                record(filename)
+                            except Exception as e:
+                                record(filename, e)
     except Exception as e:
-        return False, 0, f"Failed to decompress {local_zst}: {str(e)}"
+        return False, files_moved, f"Failed to download and extract {remote_path}: {str(e)}"
+    finally:
+        channels.close()
 
-    # Extract all files from .tar (not just CSV)
-    extracted_files = []
-    try:
-        with tarfile.open(local_tar, "r") as tar:
-            for member in tar.getmembers():
-                if member.isfile():  # Only extract regular files
-                    tar.extract(member, path=work_dir)
-                    extracted_files.append(os.path.join(work_dir, member.name))
-    except Exception as e:
-        return False, 0, f"Failed to extract .tar: {str(e)}"
+    if not files_moved and not errors:
+        return False, 0, f"No files found in {remote_path}"
 
-    if not extracted_files:
-        return False, 0, f"No files found in {local_tar}"
+    if errors:
+        return False, files_moved, f"Completed with errors: {'; '.join(errors)}"
+    return True, files_moved, f"Successfully processed {files_moved} files"
 
-    # Ensure target_dir exists
+
+def _open_tuned_socket(hostname, port=22, timeout=30):
+    """
+    Connect a TCP socket (IPv4 or IPv6, giving up after timeout seconds) with Nagle
+    disabled and large send/receive buffers for bulk SFTP.
+    """
+    sock = socket.create_connection((hostname, port), timeout=timeout)
     try:
-        sftp_client.listdir(target_dir)
-    except FileNotFoundError:
-        try:
-            sftp_client.mkdir(target_dir)
-        except Exception as e:
-            return False, 0, f"Failed to create target directory {target_dir}: {str(e)}"
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 32 << 20)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 32 << 20)
+    except OSError:
+        sock.close()
+        raise
+    return sock
 
-    # Move files to target_dir (upload)
-    files_moved = 0
-    errors = []
-    for file_path in extracted_files:
-        filename = os.path.basename(file_path)
-        remote_dest = f"{target_dir}/{filename}"
-        try:
-            sftp_client.put(file_path, remote_dest)
-            files_moved += 1
-            print(f"✓ Uploaded {filename} for RequestID {request_id}")
-        except Exception as e:
-            errors.append(f"Failed to upload {filename}: {str(e)}")
 
-    # Cleanup local files
-    for f in [local_zst, local_tar] + extracted_files:
-        try:
-            os.remove(f)
-        except Exception:
-            pass
-
-    # Attempt to remove any empty directories created by extraction (but don't touch base tmp unless we created it)
-    extracted_dirs = []
-    for file_path in extracted_files:
-        dir_path = os.path.dirname(file_path)
-        if dir_path and dir_path != local_tmp_dir and dir_path not in extracted_dirs:
-            extracted_dirs.append(dir_path)
-    for d in sorted(extracted_dirs, key=lambda p: len(p.split(os.sep)), reverse=True):
+def get_sftp(hostname, username, password=None, key_path=None):
+    """
+    Return a pooled SFTP client for (hostname, username), connecting on first use
+    or when the cached transport has dropped. Call close_all() when done.
+    """
+    key = (hostname, username)
+    with _sftp_pool_lock:
+        sftp = _sftp_pool.get(key)
+        if sftp is not None and sftp.get_channel().get_transport().is_active():
+            return sftp
+
+        transport = paramiko.Transport(_open_tuned_socket(hostname))
+        # Large window/packet sizes so bulk transfers aren't throttled waiting for window adjusts
+        transport.default_window_size = 2147483647
+        transport.default_max_packet_size = 262144
+        # Archives are already zstd-compressed, so SSH compression would only burn CPU
+        transport.use_compression(False)
+        # Rekeying every 512 MiB stalls long transfers; push the thresholds out
+        transport.packetizer.REKEY_BYTES = pow(2, 40)
+        transport.packetizer.REKEY_PACKETS = pow(2, 40)
         try:
-            # Remove leaf directories upward until non-empty or reach base tmp
-            rel = os.path.relpath(d, start=local_tmp_dir)
-            if rel == ".":
-                continue
-            os.removedirs(d)
+            if key_path:
+                private_key = paramiko.RSAKey.from_private_key_file(key_path)
+                transport.connect(username=username, pkey=private_key)
+            else:
+                transport.connect(username=username, password=password)
+            # Keep the connection alive while archives are being extracted
+            transport.set_keepalive(30)
+            sftp = paramiko.SFTPClient.from_transport(transport)
         except Exception:
-            pass
+            transport.close()
+            raise
+        _sftp_pool[key] = sftp
+        return sftp
 
-    # Cleanup working directory entirely (safe, request-specific)
-    try:
-        shutil.rmtree(work_dir, ignore_errors=True)
-    except Exception:
-        pass
 
-    if errors:
-        return False, files_moved, f"Completed with errors: {'; '.join(errors)}"
-    return True, files_moved, f"Successfully processed {files_moved} files"
+def close_all():
+    """Close every pooled SFTP client and its transport."""
+    with _sftp_pool_lock:
+        for sftp in _sftp_pool.values():
+            transport = sftp.get_channel().get_transport()
+            try:
+                sftp.close()
+            except Exception:
+                pass
+            try:
+                transport.close()
+            except Exception:
+                pass
+        _sftp_pool.clear()
 
 
 def process_requestids(requestid_to_target, hostname, username, password=None, key_path=None, local_tmp_dir="/tmp"):
     """
-    Process multiple RequestIDs: download, decompress, extract, and move CSVs to target directories
+    Process multiple RequestIDs: download, decompress, extract, and move CSVs to target directories.
+    Uses the pooled connection from get_sftp(); call close_all() once all batches are done.
     """
-    transport = paramiko.Transport((hostname, 22))
-    if key_path:
-        private_key = paramiko.RSAKey.from_private_key_file(key_path)
-        transport.connect(username=username, pkey=private_key)
-    else:
-        transport.connect(username=username, password=password)
-    sftp = paramiko.SFTPClient.from_transport(transport)
+    sftp = get_sftp(hostname, username, password=password, key_path=key_path)
     results = {}
-    try:
-        for request_id, target_dir in requestid_to_target.items():
-            print(f"\nProcessing RequestID: {request_id}")
-            print(f"Target directory: {target_dir}")
-            success, files_moved, message = process_requestid_file(
-                sftp, request_id, target_dir, local_tmp_dir
-            )
-            results[request_id] = {
-                "success": success,
-                "files_moved": files_moved,
-                "message": message,
-            }
-            print(f"Result: {message}")
-    finally:
-        if sftp:
-            sftp.close()
-        if transport:
-            transport.close()
+    for request_id, target_dir in requestid_to_target.items():
+        log.info(f"Processing RequestID: {request_id}")
+        log.info(f"Target directory: {target_dir}")
+        success, files_moved, message = process_requestid_file(
+            sftp, request_id, target_dir, local_tmp_dir
+        )
+        results[request_id] = {
+            "success": success,
+            "files_moved": files_moved,
+            "message": message,
+        }
+        log.info(f"Result: {message}")
     return results
 
 def restore_for_requestids(sftp_client, requestid_to_target, temp_dir="/tmp", progress_callback=None, mute_output=False):
@@ -294,42 +501,47 @@ def restore_for_requestids(sftp_client, requestid_to_target, temp_dir="/tmp", pr
     """
     results = {}
     total_requests = len(requestid_to_target)
-    
-    for i, (request_id, target_dir) in enumerate(requestid_to_target.items()):
-        if not mute_output:
-            print(f"\nProcessing RequestID: {request_id}")
-            print(f"Target directory: {target_dir}")
-        
-        # Try the compressed file approach first
-        success, files_moved, message = process_requestid_file(
-            sftp_client, request_id, target_dir, temp_dir
-        )
-        
-        # If that fails, try the raw files approach
-        if not success and "No .tar.zst file found" in message:
-            if not mute_output:
-                print(f"Trying raw files approach for RequestID: {request_id}")
-            success, files_moved, message = process_requestid_raw_files(
+
+    # Muting is per thread, so concurrent restores from executor threads don't affect each other
+    previously_muted = getattr(_muted, "active", False)
+    _muted.active = previously_muted or mute_output
+
+    try:
+        for i, (request_id, target_dir) in enumerate(requestid_to_target.items()):
+            log.info(f"Processing RequestID: {request_id}")
+            log.info(f"Target directory: {target_dir}")
+
+            # Try the compressed file approach first
+            success, files_moved, message = process_requestid_file(
                 sftp_client, request_id, target_dir, temp_dir
             )
-        
-        results[request_id] = {
-            "success": success,
-            "files_moved": files_moved,
-            "message": message,
-        }
-        
-        if not mute_output:
-            print(f"Result: {message}")
-        
-        # Call progress callback if provided
-        if progress_callback:
-            progress_callback(i + 1, total_requests, request_id, success, files_moved, message)
-    
+
+            # If that fails, try the raw files approach
+            if not success and "No .tar.zst file found" in message:
+                log.info(f"Trying raw files approach for RequestID: {request_id}")
+                success, files_moved, message = process_requestid_raw_files(
+                    sftp_client, request_id, target_dir, temp_dir
+                )
+
+            results[request_id] = {
+                "success": success,
+                "files_moved": files_moved,
+                "message": message,
+            }
+
+            log.info(f"Result: {message}")
+
+            # Call progress callback if provided
+            if progress_callback:
+                progress_callback(i + 1, total_requests, request_id, success, files_moved, message)
+    finally:
+        _muted.active = previously_muted
+
     return results
 
-# Example usage:
-if __name__ == "__main__":
+def main():
+    """Example usage: restore a fixed set of RequestIDs and print a summary."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     requestid_to_target = {
         "12345": "/path/to/target/dir1",
         "67890": "/path/to/target/dir2",
@@ -338,7 +550,10 @@ if __name__ == "__main__":
     hostname = "your.sftp.server"
     username = "your_username"
     password = "your_password"  # Or use key_path instead
-    results = process_requestids(requestid_to_target, hostname, username, password)
+    try:
+        results = process_requestids(requestid_to_target, hostname, username, password)
+    finally:
+        close_all()
     print("\n" + "=" * 50)
     print("SUMMARY")
     print("=" * 50)
@@ -347,3 +562,7 @@ if __name__ == "__main__":
         print(f"RequestID {request_id}: {status} - {result['files_moved']} CSV files processed")
         if not result["success"]:
             print(f"  Error: {result['message']}")
+
+
+if __name__ == "__main__":
+    main()
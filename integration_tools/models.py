@@ -3,7 +3,7 @@ Database models for integration tools.
 """
 
 from datetime import datetime
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from typing import Optional, List
 
@@ -14,7 +14,13 @@ class Base(DeclarativeBase):
 
 class School(Base):
     __tablename__ = 'School'
-    __table_args__ = {'schema': 'dbo'}
+    __table_args__ = (
+        Index(
+            'ix_School_DistrictID_Status', 'DistrictID', 'Status',
+            mssql_include=['Name', 'Code'],
+        ),
+        {'schema': 'dbo'},
+    )
 
     SchoolID: Mapped[int] = mapped_column(primary_key=True)
     DistrictID: Mapped[int]
@@ -91,7 +97,10 @@ class RequestEmailNotification(Base):
 
 class DistrictDataParm(Base):
     __tablename__ = "DistrictDataParm"
-    __table_args__ = {"schema": "dbo"}
+    __table_args__ = (
+        Index("ix_DistrictDataParm_DistrictID_ImportType", "DistrictID", "ImportType"),
+        {"schema": "dbo"},
+    )
 
     DistrictDataParmID: Mapped[int] = mapped_column(primary_key=True)
     DistrictID: Mapped[int]
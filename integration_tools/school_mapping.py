@@ -3,19 +3,35 @@ School mapping utilities for fixing integration errors.
 """
 
 import json
-from typing import Dict, List, Optional
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Union
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session, load_only
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from .models import School, DistrictDataParm
 
 
+def _loads(data: str):
+    """
+    Parse JSON text, using orjson when it is installed. Writes always go through
+    json.dumps so the stored config text doesn't depend on the environment.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def interactive_school_mapping_fix(
     db: Session,
     district_id: int,
     import_types: List[str],
     json_path: str,
-    integration_name: str
+    integration_name: str,
+    mapping_overrides: Optional[Dict[str, Union[int, str]]] = None
 ) -> bool:
     """
     Interactive school mapping fix for integration errors.
@@ -26,6 +42,8 @@ def interactive_school_mapping_fix(
         import_types: List of import types to check
         json_path: JSON path to school mappings in config
         integration_name: Name of the integration
+        mapping_overrides: Optional external school ID -> LinkIt SchoolID (or
+            school Code) mappings to apply to every record without prompting
         
     Returns:
         True if successful, False otherwise
@@ -45,29 +63,45 @@ def interactive_school_mapping_fix(
             return False
         
         # Get all schools for this district
-        schools = db.query(School).filter(
-            School.DistrictID == district_id,
-            School.Status == 1
-        ).order_by(School.Name).all()
+        # Only the columns shown to the user are loaded
+        schools = db.execute(
+            select(School)
+            .options(load_only(School.SchoolID, School.Name, School.Code))
+            .where(School.DistrictID == district_id, School.Status == 1)
+            .order_by(School.Name)
+        ).scalars().all()
         
         if not schools:
             print(f"No active schools found for District {district_id}")
             return False
         
+        by_id = {s.SchoolID: s for s in schools}
+        by_code = {s.Code: s for s in schools if s.Code}
+        
         print(f"Found {len(schools)} active schools:")
         for i, school in enumerate(schools, 1):
             print(f"  {i:2d}. {school.Name} (Code: {school.Code})")
         
-        # Process each record
-        updated_count = 0
+        # Resolve programmatic mappings up front so every record gets the same set
+        resolved = None
+        if mapping_overrides is not None:
+            resolved = {}
+            for external_id, target in mapping_overrides.items():
+                school = by_id.get(target) or by_code.get(str(target))
+                if school is None:
+                    print(f"Unknown LinkIt school '{target}' for '{external_id}', skipping")
+                    continue
+                resolved[str(external_id)] = school.SchoolID
+        
+        # Process each record; changes are committed once after the loop
+        path_parts = json_path.replace("$.", "").split(".")
+        updated = []
         for record in records:
             try:
-                config_data = json.loads(record.JSONDataConfig or "{}")
+                config_data = _loads(record.JSONDataConfig or "{}")
                 
                 # Navigate to school mappings using json_path
                 current = config_data
-                path_parts = json_path.replace("$.", "").split(".")
-                
                 for part in path_parts:
                     if part not in current:
                         current[part] = {}
@@ -77,6 +111,14 @@ def interactive_school_mapping_fix(
                 print(f"\nProcessing {record.ImportType}:")
                 print(f"Current school mappings: {json.dumps(current, indent=2)}")
                 
+                if resolved is not None:
+                    if resolved:
+                        current.update(resolved)
+                        record.JSONDataConfig = json.dumps(config_data)
+                        updated.append(record)
+                        print(f"Updated {record.ImportType} configuration")
+                    continue
+                
                 # Ask user if they want to update this record
                 update = input(f"Update school mappings for {record.ImportType}? (y/n): ").lower()
                 
@@ -115,8 +157,7 @@ def interactive_school_mapping_fix(
                     
                     # Update the record
                     record.JSONDataConfig = json.dumps(config_data)
-                    db.commit()
-                    updated_count += 1
+                    updated.append(record)
                     print(f"Updated {record.ImportType} configuration")
                 
             except json.JSONDecodeError as e:
@@ -126,8 +167,11 @@ def interactive_school_mapping_fix(
                 print(f"Error processing {record.ImportType}: {e}")
                 continue
         
-        print(f"\nCompleted: Updated {updated_count}/{len(records)} records")
-        return updated_count > 0
+        if updated:
+            db.commit()
+        
+        print(f"\nCompleted: Updated {len(updated)}/{len(records)} records")
+        return len(updated) > 0
         
     except Exception as e:
         print(f"Error in school mapping fix: {e}")
@@ -148,22 +192,23 @@ def get_school_mapping_errors(db: Session, district_id: int) -> Dict[str, List[s
     errors = {}
     
     try:
-        # Query for recent errors (this would need to be customized based on your error logging)
+        # Query for recent errors (this would need to be customized based on your error logging).
+        # Messages are aggregated per import type on the server, newest first, joined
+        # with the ASCII record separator so they can be split apart again here.
         sql = text("""
-            SELECT ImportType, ErrorMessage 
+            SELECT ImportType,
+                   STRING_AGG(CAST(ErrorMessage AS NVARCHAR(MAX)), CHAR(30))
+                       WITHIN GROUP (ORDER BY CreatedDate DESC) AS Messages
             FROM ImportErrors 
             WHERE DistrictID = :district_id 
             AND ErrorMessage LIKE '%school%mapping%'
-            ORDER BY CreatedDate DESC
+            GROUP BY ImportType
         """)
         
         result = db.execute(sql, {"district_id": district_id})
         
         for row in result:
-            import_type = row.ImportType
-            if import_type not in errors:
-                errors[import_type] = []
-            errors[import_type].append(row.ErrorMessage)
+            errors[row.ImportType] = row.Messages.split(chr(30)) if row.Messages else []
     
     except Exception as e:
         print(f"Could not retrieve school mapping errors: {e}")
@@ -2,28 +2,233 @@
 Common request workflows for frequent operations.
 """
 
+import asyncio
 import json
+import sys
+import time
+from collections import OrderedDict, defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
 
 from integration_tools.core.async_request_manager import AsyncRequestManager
+from integration_tools.core.db_manager import RequestRow
+from integration_tools.core.request_manager import RequestManager
+
+
+_get_request_id = attrgetter("RequestID")
+_get_request_details = attrgetter("RequestID", "DistrictID", "DataRequestTypeName", "Status")
+_REQUEST_DETAIL_KEYS = ("RequestID", "DistrictID", "TypeName", "Status")
+
+# Below this many requests the plain loop beats pandas' DataFrame setup cost
+_PANDAS_MIN_REQUESTS = 1000
+
+
+def _failed_request_entry(request: RequestRow) -> Dict[str, object]:
+    """Summarize a failed request for the monitoring report."""
+    return {
+        "RequestID": request.RequestID,
+        "DistrictID": request.DistrictID,
+        "TypeName": request.DataRequestTypeName,
+        "RequestTime": request.request_time_iso,
+        "RequestTimeEST": request.request_time_est_iso
+    }
+
+
+def _tally_requests_pandas(
+    all_requests: List[RequestRow]
+) -> Tuple[Dict[str, Dict[str, int]], Dict[int, Dict[str, int]]]:
+    """
+    Build the per-type and per-district tallies with pandas group-bys instead of a loop.
+    
+    Args:
+        all_requests: Requests to tally (Status 4 counts as failed, anything else as success)
+        
+    Returns:
+        Tuple of (by_type, by_district) in the same shape as the loop-based tallies
+    """
+    failed = pd.Series([r.Status for r in all_requests]).eq(4)
+    
+    def tally(values: List[object]) -> Dict[object, Dict[str, int]]:
+        # factorize numbers groups by first appearance and gives missing keys their own
+        # code (-1) rather than dropping them, so None IDs/types are tallied like the loop does
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        counts = (
+            pd.DataFrame({"Code": codes, "Key": failed.map({True: "failed", False: "success"})})
+            .groupby(["Code", "Key"]).size()
+            .unstack(fill_value=0)
+            .reindex(columns=["success", "failed"], fill_value=0)
+            .to_dict("index")
+        )
+        return {
+            (uniques[code] if code >= 0 else None): {
+                "success": int(counts[code]["success"]), "failed": int(counts[code]["failed"])
+            }
+            for code in pd.unique(codes)
+        }
+    
+    return (
+        tally([r.DataRequestTypeName for r in all_requests]),
+        tally([r.DistrictID for r in all_requests])
+    )
+
+
+class _ProgressBuffer:
+    """Collects progress lines and writes each phase's lines to stdout in one call."""
+    
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lines: List[str] = []
+    
+    def add(self, message: str) -> None:
+        if self.enabled:
+            self._lines.append(message)
+    
+    def flush(self) -> None:
+        if self._lines:
+            sys.stdout.write("\n".join(self._lines) + "\n")
+            sys.stdout.flush()
+            self._lines.clear()
 
 
-@dataclass
+@dataclass(frozen=True, eq=True, unsafe_hash=False)
 class WorkflowResult:
-    """Result of a workflow execution."""
+    """Result of a workflow execution.
+
+    Instances are immutable but unhashable, since ``data`` is a dict.
+    """
+    # Declared by hand since dataclass(slots=True) needs Python 3.10
+    __slots__ = ("success", "message", "data", "steps_completed", "total_steps")
+    # Frozen dataclasses with eq otherwise get a field hash that fails on data
+    __hash__ = None  # type: ignore[assignment]
+    
     success: bool
     message: str
     data: Dict[str, object]
     steps_completed: int
     total_steps: int
+    
+    # Without a __dict__, pickle and copy restore slots through setattr, which frozen
+    # instances reject; dataclass(slots=True) only generates these from Python 3.10
+    def __getstate__(self) -> Tuple[object, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def __setstate__(self, state: Tuple[object, ...]) -> None:
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
 
 
 class CommonWorkflows:
     """Collection of common request workflows."""
     
-    def __init__(self, request_manager: Optional[AsyncRequestManager] = None):
+    # Maximum number of distinct find_requests criteria kept in the cache
+    _FIND_CACHE_SIZE = 128
+    
+    def __init__(
+        self,
+        request_manager: Optional[AsyncRequestManager] = None,
+        find_cache_ttl: float = 0.0
+    ):
         self.request_manager = request_manager or AsyncRequestManager()
+        # Seconds to reuse find_requests results for identical criteria; off by default,
+        # since cached rows would hide status changes made outside these workflows
+        self.find_cache_ttl = find_cache_ttl
+        self._find_cache: "OrderedDict[tuple, Tuple[float, List[RequestRow]]]" = OrderedDict()
+    
+    def clear_find_cache(self) -> None:
+        """Drop all cached find_requests results, e.g. after request statuses change."""
+        self._find_cache.clear()
+    
+    async def _find_requests_cached(self, **criteria) -> List[RequestRow]:
+        """
+        Run find_requests in the default executor, reusing results for identical
+        criteria seen within the last find_cache_ttl seconds (when caching is on).
+        
+        Args:
+            **criteria: find_requests keyword arguments
+            
+        Returns:
+            List of RequestRow objects
+        """
+        key = tuple(sorted(
+            (k, tuple(v) if isinstance(v, (list, tuple)) else v)
+            for k, v in criteria.items()
+        ))
+        now = time.monotonic()
+        
+        hit = self._find_cache.get(key)
+        if hit is not None and now - hit[0] < self.find_cache_ttl:
+            self._find_cache.move_to_end(key)
+            return list(hit[1])
+        
+        loop = asyncio.get_event_loop()
+        rows = await loop.run_in_executor(
+            None,
+            lambda: self.request_manager.find_requests(**criteria)
+        )
+        
+        if self.find_cache_ttl > 0:
+            self._find_cache[key] = (now, rows)
+            self._find_cache.move_to_end(key)
+            if len(self._find_cache) > self._FIND_CACHE_SIZE:
+                self._find_cache.popitem(last=False)
+        return list(rows)
+    
+    async def _find_requests_by_district(
+        self,
+        district_ids: Optional[List[int]],
+        max_db_concurrent: int = 8,
+        **criteria
+    ) -> List[RequestRow]:
+        """
+        Run find_requests off the event loop, one query per district in parallel.
+        
+        Requests are the latest per (district, type), so per-district queries return
+        the same rows as a single query across all districts.
+        
+        Args:
+            district_ids: District IDs to query, or None for no district filter
+            max_db_concurrent: Maximum concurrent database queries
+            **criteria: Other find_requests filters (type_names, statuses, ...)
+            
+        Returns:
+            List of RequestRow objects, de-duplicated by RequestID, newest RequestTime first
+            (as a single find_requests query returns them)
+        """
+        if not district_ids or len(district_ids) == 1:
+            return await self._find_requests_cached(district_ids=district_ids, **criteria)
+        
+        # Resolve credentials and open the pool's connections once up front, so parallel
+        # queries neither prompt for credentials nor each pay for a new connection
+        if isinstance(self.request_manager, RequestManager):
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None, self.request_manager.warm_db_pool, min(max_db_concurrent, len(district_ids))
+            )
+        
+        semaphore = asyncio.Semaphore(max_db_concurrent)
+        
+        async def find_single(district_id: int) -> List[RequestRow]:
+            async with semaphore:
+                return await self._find_requests_cached(district_ids=[district_id], **criteria)
+        
+        per_district = await asyncio.gather(*[find_single(d) for d in district_ids])
+        
+        requests = []
+        seen = set()
+        for rows in per_district:
+            for r in rows:
+                if r.RequestID not in seen:
+                    seen.add(r.RequestID)
+                    requests.append(r)
+        # Restore the single-query order; rows without a RequestTime sort last
+        requests.sort(key=lambda r: (r.RequestTime is not None, r.RequestTime or 0), reverse=True)
+        return requests
     
     async def district_refresh_workflow(
         self,
@@ -31,7 +236,10 @@ class CommonWorkflows:
         type_names: List[str] = ["SAT", "PSAT"],
         delete_checksums: bool = True,
         restore_files: bool = True,
-        show_progress: bool = True
+        show_progress: bool = True,
+        max_db_concurrent: int = 8,
+        max_concurrent_restores: int = 3,
+        restore_chunk_size: int = 4
     ) -> WorkflowResult:
         """
         Complete district refresh workflow:
@@ -46,21 +254,34 @@ class CommonWorkflows:
             delete_checksums: Whether to delete checksums
             restore_files: Whether to restore files first
             show_progress: Whether to show progress
+            max_db_concurrent: Maximum concurrent per-district request lookups
+            max_concurrent_restores: Maximum concurrent SFTP restores, each on its own connection
+            restore_chunk_size: Requests restored per SFTP connection
             
         Returns:
             WorkflowResult with complete operation results
         """
-        total_steps = 3 if restore_files else 2
+        steps = [
+            label for label in (
+                "Finding latest requests...",
+                "Restoring files to SFTP..." if restore_files else None,
+                f"Rerunning requests{' with checksum deletion' if delete_checksums else ''}...",
+            )
+            if label is not None
+        ]
+        total_steps = len(steps)
         completed_steps = 0
         workflow_data = {}
+        progress = _ProgressBuffer(show_progress)
         
         try:
             # Step 1: Find requests
-            if show_progress:
-                print("Step 1: Finding latest requests...")
+            progress.add(f"Step 1: {steps[0]}")
+            progress.flush()
             
-            requests = self.request_manager.find_requests(
-                district_ids=district_ids,
+            requests = await self._find_requests_by_district(
+                district_ids,
+                max_db_concurrent=max_db_concurrent,
                 type_names=type_names
             )
             
@@ -73,46 +294,53 @@ class CommonWorkflows:
                     total_steps=total_steps
                 )
             
-            request_ids = [r.RequestID for r in requests]
+            request_ids = list(map(_get_request_id, requests))
             workflow_data["requests_found"] = len(request_ids)
             workflow_data["request_ids"] = request_ids
             
-            if show_progress:
-                print(f"Found {len(request_ids)} requests across {len(district_ids)} districts")
+            progress.add(f"Found {len(request_ids)} requests across {len(district_ids)} districts")
             
             completed_steps += 1
             
             # Step 2: Restore files (optional)
             if restore_files:
-                if show_progress:
-                    print("Step 2: Restoring files to SFTP...")
+                progress.add(f"Step {completed_steps + 1}: {steps[completed_steps]}")
+                progress.flush()
                 
                 restore_results = await self.request_manager.restore_files_batch(
-                    request_ids, show_progress=show_progress
+                    request_ids,
+                    max_concurrent=max_concurrent_restores,
+                    show_progress=show_progress,
+                    chunk_size=restore_chunk_size
                 )
                 workflow_data["restore_results"] = restore_results
                 
                 successful_restores = sum(1 for r in restore_results.values() if r.get("success"))
-                if show_progress:
-                    print(f"Restored files for {successful_restores}/{len(request_ids)} requests")
+                progress.add(f"Restored files for {successful_restores}/{len(request_ids)} requests")
                 
                 completed_steps += 1
             
             # Step 3: Rerun with checksum deletion
-            if show_progress:
-                step_num = 3 if restore_files else 2
-                print(f"Step {step_num}: Rerunning requests{'with checksum deletion' if delete_checksums else ''}...")
-            
-            rerun_result = self.request_manager.rerun_requests(
-                request_ids,
-                delete_checksums=delete_checksums
-            )
+            progress.add(f"Step {completed_steps + 1}: {steps[completed_steps]}")
+            progress.flush()
+            
+            loop = asyncio.get_event_loop()
+            try:
+                rerun_result = await loop.run_in_executor(
+                    None,
+                    lambda: self.request_manager.rerun_requests(
+                        request_ids,
+                        delete_checksums=delete_checksums
+                    )
+                )
+            finally:
+                # Rerun changes request statuses, even when it fails partway
+                self.clear_find_cache()
             workflow_data["rerun_result"] = rerun_result
             
-            if show_progress:
-                print(f"Updated {rerun_result['queues_updated']} queue entries")
-                if delete_checksums:
-                    print(f"Deleted {rerun_result['checksums_deleted']} checksum entries")
+            progress.add(f"Updated {rerun_result['queues_updated']} queue entries")
+            if delete_checksums:
+                progress.add(f"Deleted {rerun_result['checksums_deleted']} checksum entries")
             
             completed_steps += 1
             
@@ -132,6 +360,8 @@ class CommonWorkflows:
                 steps_completed=completed_steps,
                 total_steps=total_steps
             )
+        finally:
+            progress.flush()
     
     async def bulk_file_download_workflow(
         self,
@@ -139,7 +369,9 @@ class CommonWorkflows:
         district_ids: Optional[List[int]] = None,
         local_dir: str = "~/Downloads/bulk_download",
         max_concurrent: int = 5,
-        show_progress: bool = True
+        show_progress: bool = True,
+        max_db_concurrent: int = 8,
+        include_request_details: bool = False
     ) -> WorkflowResult:
         """
         Bulk download workflow:
@@ -153,20 +385,24 @@ class CommonWorkflows:
             local_dir: Local directory for downloads
             max_concurrent: Maximum concurrent downloads
             show_progress: Whether to show progress
+            max_db_concurrent: Maximum concurrent per-district request lookups
+            include_request_details: Whether to add per-request details to the result data
             
         Returns:
             WorkflowResult with download results
         """
         workflow_data = {}
+        progress = _ProgressBuffer(show_progress)
         
         try:
             # Step 1: Find requests
-            if show_progress:
-                print("Step 1: Finding matching requests...")
+            progress.add("Step 1: Finding matching requests...")
+            progress.flush()
             
-            requests = self.request_manager.find_requests(
-                type_names=type_names,
-                district_ids=district_ids
+            requests = await self._find_requests_by_district(
+                district_ids,
+                max_db_concurrent=max_db_concurrent,
+                type_names=type_names
             )
             
             if not requests:
@@ -178,21 +414,17 @@ class CommonWorkflows:
                     total_steps=2
                 )
             
-            request_ids = [r.RequestID for r in requests]
+            request_ids = list(map(_get_request_id, requests))
             workflow_data["requests_found"] = len(request_ids)
-            workflow_data["request_details"] = [
-                {
-                    "RequestID": r.RequestID,
-                    "DistrictID": r.DistrictID,
-                    "TypeName": r.DataRequestTypeName,
-                    "Status": r.Status
-                }
-                for r in requests
-            ]
+            if include_request_details:
+                workflow_data["request_details"] = [
+                    dict(zip(_REQUEST_DETAIL_KEYS, details))
+                    for details in map(_get_request_details, requests)
+                ]
             
             # Step 2: Download files
-            if show_progress:
-                print(f"Step 2: Downloading files for {len(request_ids)} requests...")
+            progress.add(f"Step 2: Downloading files for {len(request_ids)} requests...")
+            progress.flush()
             
             download_results = await self.request_manager.download_files_batch(
                 request_ids,
@@ -229,6 +461,8 @@ class CommonWorkflows:
                 steps_completed=1,
                 total_steps=2
             )
+        finally:
+            progress.flush()
     
     async def integration_monitoring_workflow(
         self,
@@ -252,13 +486,14 @@ class CommonWorkflows:
             WorkflowResult with monitoring data
         """
         workflow_data = {}
+        progress = _ProgressBuffer(show_progress)
         
         try:
-            if show_progress:
-                print(f"Monitoring {', '.join(integration_types)} integrations for last {days_back} days...")
+            progress.add(f"Monitoring {', '.join(integration_types)} integrations for last {days_back} days...")
+            progress.flush()
             
             # Find all recent requests
-            all_requests = self.request_manager.find_requests(
+            all_requests = await self._find_requests_cached(
                 type_names=integration_types,
                 statuses=[4, 5]  # Failed and successful
             )
@@ -272,52 +507,44 @@ class CommonWorkflows:
                     total_steps=1
                 )
             
-            # Analyze requests by status and type
-            analysis = {
-                "by_status": {"success": 0, "failed": 0},
-                "by_type": {},
-                "by_district": {},
-                "failed_requests": [],
-                "districts_with_failures": set()
-            }
+            # Analyze requests by status and type. The query only returns statuses 4
+            # and 5, so anything that isn't failed counts as successful.
+            failed = [r for r in all_requests if r.Status == 4]
             
-            for request in all_requests:
-                # Status analysis
-                if request.Status == 5:
-                    analysis["by_status"]["success"] += 1
-                elif request.Status == 4:
-                    analysis["by_status"]["failed"] += 1
-                    analysis["failed_requests"].append({
-                        "RequestID": request.RequestID,
-                        "DistrictID": request.DistrictID,
-                        "TypeName": request.DataRequestTypeName,
-                        "RequestTime": request.RequestTime.isoformat() if request.RequestTime else None,
-                        "RequestTimeEST": request.RequestTimeEST.isoformat() if hasattr(request, 'RequestTimeEST') and request.RequestTimeEST else None
-                    })
-                    analysis["districts_with_failures"].add(request.DistrictID)
-                
-                # Type analysis
-                type_name = request.DataRequestTypeName
-                if type_name not in analysis["by_type"]:
-                    analysis["by_type"][type_name] = {"success": 0, "failed": 0}
-                
-                if request.Status == 5:
-                    analysis["by_type"][type_name]["success"] += 1
-                elif request.Status == 4:
-                    analysis["by_type"][type_name]["failed"] += 1
-                
-                # District analysis
-                district_id = request.DistrictID
-                if district_id not in analysis["by_district"]:
-                    analysis["by_district"][district_id] = {"success": 0, "failed": 0}
+            if pd is not None and len(all_requests) >= _PANDAS_MIN_REQUESTS:
+                by_type, by_district = _tally_requests_pandas(all_requests)
+            else:
+                by_type = defaultdict(lambda: {"success": 0, "failed": 0})
+                by_district = defaultdict(lambda: {"success": 0, "failed": 0})
                 
-                if request.Status == 5:
-                    analysis["by_district"][district_id]["success"] += 1
-                elif request.Status == 4:
-                    analysis["by_district"][district_id]["failed"] += 1
+                for request in all_requests:
+                    key = "failed" if request.Status == 4 else "success"
+                    by_type[request.DataRequestTypeName][key] += 1
+                    by_district[request.DistrictID][key] += 1
             
-            # Convert set to list for JSON serialization
-            analysis["districts_with_failures"] = list(analysis["districts_with_failures"])
+            # Plain dicts (not defaultdicts) for JSON serialization
+            analysis = {
+                "by_status": {"success": len(all_requests) - len(failed), "failed": len(failed)},
+                "by_type": dict(by_type),
+                "by_district": dict(by_district),
+                "failed_requests": list(map(_failed_request_entry, failed))
+            }
+            
+            # Split districts into healthy and failing in one pass over the tally
+            districts_with_failures = []
+            healthy_districts = 0
+            for district_id, stats in analysis["by_district"].items():
+                if stats["failed"]:
+                    districts_with_failures.append(district_id)
+                else:
+                    healthy_districts += 1
+            analysis["districts_with_failures"] = districts_with_failures
+            
+            most_problematic_type = None
+            if analysis["by_type"]:
+                most_problematic_type = max(
+                    analysis["by_type"].items(), key=lambda item: item[1]["failed"]
+                )[0]
             
             # Calculate rates
             total_requests = len(all_requests)
@@ -328,16 +555,14 @@ class CommonWorkflows:
                 "success_rate": round(success_rate, 2),
                 "analysis": analysis,
                 "summary": {
-                    "healthy_districts": len([d for d, stats in analysis["by_district"].items() if stats["failed"] == 0]),
-                    "districts_with_issues": len(analysis["districts_with_failures"]),
-                    "most_problematic_type": max(analysis["by_type"].keys(), 
-                                               key=lambda k: analysis["by_type"][k]["failed"]) if analysis["by_type"] else None
+                    "healthy_districts": healthy_districts,
+                    "districts_with_issues": len(districts_with_failures),
+                    "most_problematic_type": most_problematic_type
                 }
             }
             
-            if show_progress:
-                print(f"Analysis complete: {success_rate:.1f}% success rate across {total_requests} requests")
-                print(f"Districts with failures: {len(analysis['districts_with_failures'])}")
+            progress.add(f"Analysis complete: {success_rate:.1f}% success rate across {total_requests} requests")
+            progress.add(f"Districts with failures: {len(analysis['districts_with_failures'])}")
             
             return WorkflowResult(
                 success=True,
@@ -354,4 +579,6 @@ class CommonWorkflows:
                 data=workflow_data,
                 steps_completed=0,
                 total_steps=1
-            )
\ No newline at end of file
+            )
+        finally:
+            progress.flush()
@@ -2,22 +2,33 @@
 Test configuration and fixtures for integration tools.
 """
 
+import asyncio
 import os
-import tempfile
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch, sentinel
 import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from integration_tools.models import Base
 from integration_tools.core.credential_manager import CredentialManager
 from integration_tools.core.db_manager import DatabaseManager
 from integration_tools.core.file_manager import FileManager
 from integration_tools.core.request_manager import RequestManager
+from integration_tools.core.async_request_manager import AsyncRequestManager
 
-@pytest.fixture
-def temp_dir():
-    """Create a temporary directory for tests."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        yield tmp_dir
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests on uvloop when it is installed, else on the default asyncio loop."""
+    if uvloop is not None:
+        return {"uvloop": uvloop.new_event_loop}
+    return {"asyncio": asyncio.new_event_loop}
 
 
 @pytest.fixture
@@ -41,28 +52,77 @@ def credential_manager():
 @pytest.fixture
 def mock_db_session():
     """Create a mock database session for testing."""
-    # Create a mock session instead of a real SQLite database
-    # This avoids schema issues with SQL Server models in SQLite
-    mock_session = MagicMock()
+    # Used for the raw T-SQL statements that SQLite cannot run; ORM queries use db_session
+    return MagicMock()
+
+
+@pytest.fixture(scope="session")
+def sqlite_engine():
+    """In-memory SQLite engine with the model tables, created once per test session."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
     
-    # Set up common mock methods
-    mock_session.query.return_value = MagicMock()
-    mock_session.execute.return_value = MagicMock()
-    mock_session.commit.return_value = None
-    mock_session.close.return_value = None
+    # pysqlite's own transaction handling lets a released SAVEPOINT commit for real, which
+    # would leak rows from code under test that commits; let SQLAlchemy emit BEGIN itself
+    @event.listens_for(engine, "connect")
+    def _no_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
     
-    return mock_session
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+    
+    engine = engine.execution_options(schema_translate_map={"dbo": None})  # SQLite has no dbo schema
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
 
 
 @pytest.fixture
+def db_session(sqlite_engine):
+    """Real database session whose changes are rolled back after each test."""
+    connection = sqlite_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(
+        bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False
+    )()
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="session")
 def db_manager():
-    """Create a database manager for testing."""
+    """Database manager shared across the test session."""
     return DatabaseManager(server="test_server", database="test_db")
 
 
+@pytest.fixture
+def patched_session(db_manager, monkeypatch):
+    """Stub engine and session creation on db_manager; returns the session get_session yields."""
+    mock_session = MagicMock(spec=["close"])
+    monkeypatch.setattr(db_manager, "_get_engine", lambda username, password: sentinel.engine)
+    monkeypatch.setattr(
+        "integration_tools.core.db_manager.sessionmaker", lambda *args, **kwargs: lambda: mock_session
+    )
+    return mock_session
+
+
 @pytest.fixture
 def file_manager():
-    """Create a file manager for testing."""
+    """Create a file manager for tests that open or close connections."""
+    return FileManager()
+
+
+@pytest.fixture(scope="module")
+def shared_fm():
+    """File manager shared by read-only tests within a module."""
     return FileManager()
 
 
@@ -71,17 +131,45 @@ def mock_sftp_client():
     """Create a mock SFTP client."""
     mock_sftp = MagicMock()
     mock_sftp.listdir.return_value = ["test_file1.csv", "test_file2.txt"]
-    mock_sftp.stat.return_value = MagicMock(st_mode=0o40000)  # Directory mode
+    mock_sftp.stat.return_value = SimpleNamespace(st_mode=0o40000)  # Directory mode
     mock_sftp.get.return_value = None
     return mock_sftp
 
 
+class StubCredentialManager(CredentialManager):
+    """Credential manager that returns fixed credentials without keyring or prompts."""
+    
+    def __init__(self, db_credentials, sftp_credentials):
+        super().__init__(service_prefix="test_integration_tools")
+        self._db_credentials = db_credentials
+        self._sftp_credentials = sftp_credentials
+        # Fetch counts, so tests can check callers cache credentials
+        self.db_calls = 0
+        self.sftp_calls = 0
+    
+    def get_db_credentials(self, interactive_save=True):
+        self.db_calls += 1
+        return self._db_credentials
+    
+    def get_sftp_credentials(self, *args, **kwargs):
+        self.sftp_calls += 1
+        return self._sftp_credentials
+
+
 @pytest.fixture
 def request_manager(mock_credentials, mock_sftp_credentials):
     """Create a request manager for testing."""
-    with patch.object(CredentialManager, 'get_db_credentials', return_value=mock_credentials), \
-         patch.object(CredentialManager, 'get_sftp_credentials', return_value=mock_sftp_credentials):
-        return RequestManager(server="test_server", database="test_db")
+    manager = RequestManager(server="test_server", database="test_db")
+    manager.credential_manager = StubCredentialManager(mock_credentials, mock_sftp_credentials)
+    return manager
+
+
+@pytest.fixture
+def async_request_manager(mock_credentials, mock_sftp_credentials):
+    """Create an async request manager with stubbed credentials for testing."""
+    manager = AsyncRequestManager(server="test_server", database="test_db")
+    manager.credential_manager = StubCredentialManager(mock_credentials, mock_sftp_credentials)
+    return manager
 
 
 @pytest.fixture
@@ -112,7 +200,7 @@ def sample_requests():
     ]
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(autouse=True, scope="session")
 def mock_keyring():
     """Mock keyring operations to avoid system keyring interactions during tests."""
     with patch('keyring.get_password', return_value=None), \
@@ -121,7 +209,7 @@ def mock_keyring():
         yield
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(autouse=True, scope="session")
 def mock_environment_variables():
     """Set up mock environment variables for tests."""
     test_env = {
@@ -0,0 +1,166 @@
+"""
+Tests for async batch request management functionality.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import paramiko
+
+from integration_tools.core.async_request_manager import AsyncRequestManager
+from integration_tools.legacy import restore_etl_proccessed
+
+
+class TestAsyncRequestManager:
+    """Test cases for AsyncRequestManager batch operations."""
+
+    async def test_restore_files_batch_limits_concurrency(self):
+        """Test that no more than max_concurrent restores run at once."""
+        manager = AsyncRequestManager(server="test_server", database="test_db")
+
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def fake_restore(request_ids, temp_dir, show_progress=False):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return {request_ids[0]: {"success": True, "files_moved": 1}}
+
+        manager.restore_files = MagicMock(side_effect=fake_restore)
+
+        results = await manager.restore_files_batch(
+            list(range(1, 11)), max_concurrent=3, show_progress=False
+        )
+
+        assert sorted(results) == list(range(1, 11))
+        assert all(r["success"] for r in results.values())
+        assert manager.restore_files.call_count == 10
+        assert peak <= 3
+
+    async def test_download_files_batch_reports_failed_requests(self):
+        """Test that a request raising an error gets a failed result carrying the error."""
+        manager = AsyncRequestManager(server="test_server", database="test_db")
+
+        def fake_download(request_ids, local_dir, show_progress=False):
+            if request_ids[0] == 2:
+                raise RuntimeError("SFTP error")
+            if request_ids[0] == 3:
+                return {}
+            return {request_ids[0]: {"success": True, "files_downloaded": 2}}
+
+        manager.download_files = MagicMock(side_effect=fake_download)
+
+        results = await manager.download_files_batch([1, 2, 3], show_progress=False)
+
+        assert results[1] == {"success": True, "files_downloaded": 2}
+        assert results[2] == {"success": False, "message": "SFTP error"}
+        assert results[3] == {"success": False, "message": "Unknown error"}
+
+    async def test_restore_files_batch_chunks_requests(self):
+        """Test that chunk_size groups request IDs into shared restore calls."""
+        manager = AsyncRequestManager(server="test_server", database="test_db")
+        manager.restore_files = MagicMock(
+            side_effect=lambda ids, temp_dir, show_progress=False: {
+                i: {"success": True, "files_moved": 1} for i in ids if i != 5
+            }
+        )
+
+        results = await manager.restore_files_batch(
+            [1, 2, 3, 4, 5], max_concurrent=2, show_progress=False, chunk_size=2
+        )
+
+        chunks = sorted(c.args[0] for c in manager.restore_files.call_args_list)
+        assert chunks == [[1, 2], [3, 4], [5]]
+        assert results[1]["success"] is True
+        assert results[5] == {"success": False, "message": "Unknown error"}
+
+    async def test_restore_files_batch_fails_every_request_in_raising_chunk(self):
+        """Test that when a chunk's restore raises, each of its request IDs gets the error."""
+        manager = AsyncRequestManager(server="test_server", database="test_db")
+
+        def fake_restore(ids, temp_dir, show_progress=False):
+            if 3 in ids:
+                raise RuntimeError("SFTP connection lost")
+            return {i: {"success": True, "files_moved": 1} for i in ids}
+
+        manager.restore_files = MagicMock(side_effect=fake_restore)
+
+        results = await manager.restore_files_batch(
+            [1, 2, 3, 4, 5], max_concurrent=2, show_progress=False, chunk_size=2
+        )
+
+        failed = {"success": False, "message": "SFTP connection lost"}
+        assert results == {
+            1: {"success": True, "files_moved": 1},
+            2: {"success": True, "files_moved": 1},
+            3: failed,
+            4: failed,
+            5: {"success": True, "files_moved": 1},
+        }
+
+    async def test_restore_chunks_keep_their_own_sftp_connections(self, async_request_manager, monkeypatch):
+        """Test that concurrent chunks through the real restore_files never share or close each other's SFTP."""
+        manager = async_request_manager
+
+        @contextmanager
+        def session(username, password):
+            yield None
+
+        monkeypatch.setattr(manager.db_manager, "get_session", session)
+        monkeypatch.setattr(
+            manager.db_manager, "get_directory_path_for_request",
+            lambda session, req_id: f"F:\\FTProot\\Districts\\{req_id}"
+        )
+
+        class FakeSFTP:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        class FakeSSHClient:
+            def set_missing_host_key_policy(self, policy):
+                pass
+
+            def connect(self, *args, **kwargs):
+                pass
+
+            def open_sftp(self):
+                self.sftp = FakeSFTP()
+                return self.sftp
+
+            def close(self):
+                pass
+
+        monkeypatch.setattr(paramiko, "SSHClient", FakeSSHClient)
+
+        both_running = threading.Barrier(2, timeout=5)
+        used = []
+
+        def fake_restore(sftp, request_to_path, temp_dir, progress_callback=None, mute_output=False):
+            both_running.wait()  # Both chunks now hold a connection
+            time.sleep(0.02)  # Give the other chunk time to finish and close its own
+            used.append(sftp)
+            return {
+                req_id: {"success": not sftp.closed, "files_moved": 1, "message": path}
+                for req_id, path in request_to_path.items()
+            }
+
+        monkeypatch.setattr(restore_etl_proccessed, "restore_for_requestids", fake_restore)
+
+        results = await manager.restore_files_batch(
+            [1, 2, 3, 4], max_concurrent=2, show_progress=False, chunk_size=2
+        )
+
+        assert all(r["success"] for r in results.values()), results
+        assert results[3]["message"] == "/Districts/3"
+        assert len({id(sftp) for sftp in used}) == 2
+        assert all(sftp.closed for sftp in used)
@@ -2,153 +2,154 @@
 Tests for credential management functionality.
 """
 
-import os
-from unittest.mock import patch, MagicMock
 import pytest
 
 from integration_tools.core.credential_manager import CredentialManager
 
 
+def _fake_keyring(saved):
+    """Build a keyring.get_password replacement backed by a {service: {account: value}} dict."""
+    return lambda service, account: saved.get(service, {}).get(account)
+
+
+def _fake_input(monkeypatch, *answers):
+    """Answer input() prompts in order."""
+    replies = iter(answers)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+
+
 class TestCredentialManager:
     """Test cases for CredentialManager."""
-    
+
     def test_init(self):
         """Test credential manager initialization."""
         cm = CredentialManager("test_service")
         assert cm.service_prefix == "test_service"
         assert cm.db_service == "test_service_db"
         assert cm.sftp_service == "test_service_sftp"
-    
-    def test_get_db_credentials_from_env(self, credential_manager):
+
+    def test_get_db_credentials_from_env(self, credential_manager, monkeypatch):
         """Test getting DB credentials from environment variables."""
-        with patch.dict(os.environ, {'DB_UID': 'env_user', 'DB_PWD': 'env_pass'}):
-            username, password = credential_manager.get_db_credentials()
-            assert username == 'env_user'
-            assert password == 'env_pass'
-    
-    @patch('keyring.get_password')
-    def test_get_db_credentials_from_keyring(self, mock_get_password, credential_manager):
+        monkeypatch.setenv("DB_UID", "env_user")
+        monkeypatch.setenv("DB_PWD", "env_pass")
+
+        username, password = credential_manager.get_db_credentials()
+        assert username == 'env_user'
+        assert password == 'env_pass'
+
+    def test_get_db_credentials_from_keyring(self, credential_manager, monkeypatch):
         """Test getting DB credentials from keyring."""
-        mock_get_password.side_effect = lambda service, account: {
+        monkeypatch.delenv("DB_UID", raising=False)
+        monkeypatch.delenv("DB_PWD", raising=False)
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({
             'test_integration_tools_db': {'username': 'keyring_user', 'password': 'keyring_pass'}
-        }.get(service, {}).get(account)
-        
-        with patch.dict(os.environ, {}, clear=True):  # Clear env vars
-            username, password = credential_manager.get_db_credentials()
-            assert username == 'keyring_user'
-            assert password == 'keyring_pass'
-    
-    @patch('builtins.input')
-    @patch('getpass.getpass')
-    @patch('keyring.set_password')
-    def test_get_db_credentials_prompt(self, mock_set_password, mock_getpass, 
-                                     mock_input, credential_manager):
+        }))
+
+        username, password = credential_manager.get_db_credentials()
+        assert username == 'keyring_user'
+        assert password == 'keyring_pass'
+
+    def test_get_db_credentials_prompt(self, credential_manager, monkeypatch):
         """Test prompting for DB credentials."""
-        mock_input.side_effect = ['prompt_user', 'y']  # username, save choice
-        mock_getpass.return_value = 'prompt_pass'
-        
-        with patch.dict(os.environ, {}, clear=True), \
-             patch('keyring.get_password', return_value=None):
-            username, password = credential_manager.get_db_credentials()
-            
-            assert username == 'prompt_user'
-            assert password == 'prompt_pass'
-            mock_set_password.assert_called()
-    
-    @patch('keyring.get_password')
-    @patch('builtins.input')
-    def test_get_sftp_credentials_from_keyring(self, mock_input, mock_get_password, credential_manager):
+        saved = []
+        monkeypatch.delenv("DB_UID", raising=False)
+        monkeypatch.delenv("DB_PWD", raising=False)
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({}))
+        monkeypatch.setattr("keyring.set_password", lambda *args: saved.append(args))
+        monkeypatch.setattr("getpass.getpass", lambda prompt="": 'prompt_pass')
+        _fake_input(monkeypatch, 'prompt_user', 'y')  # username, save choice
+
+        username, password = credential_manager.get_db_credentials()
+
+        assert username == 'prompt_user'
+        assert password == 'prompt_pass'
+        assert saved
+
+    def test_get_sftp_credentials_from_keyring(self, credential_manager, monkeypatch):
         """Test getting SFTP credentials from keyring."""
-        mock_get_password.side_effect = lambda service, account: {
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({
             'test_integration_tools_sftp': {
                 'host': 'saved_host.com',
                 'username': 'saved_user',
                 'password': 'saved_pass'
             }
-        }.get(service, {}).get(account)
-        
-        mock_input.return_value = 'y'  # Use saved credentials
-        
+        }))
+        _fake_input(monkeypatch, 'y')  # Use saved credentials
+
         host, username, password = credential_manager.get_sftp_credentials()
         assert host == 'saved_host.com'
         assert username == 'saved_user'
         assert password == 'saved_pass'
-    
-    @patch('builtins.input')
-    @patch('getpass.getpass')
-    @patch('keyring.set_password')
-    def test_get_sftp_credentials_prompt(self, mock_set_password, mock_getpass, 
-                                       mock_input, credential_manager):
+
+    def test_get_sftp_credentials_prompt(self, credential_manager, monkeypatch):
         """Test prompting for SFTP credentials."""
-        mock_input.side_effect = ['test.host.com', 'test_user', 'y']  # host, username, save choice
-        mock_getpass.return_value = 'test_pass'
-        
-        with patch('keyring.get_password', return_value=None):
-            host, username, password = credential_manager.get_sftp_credentials()
-            
-            assert host == 'test.host.com'
-            assert username == 'test_user'
-            assert password == 'test_pass'
-            mock_set_password.assert_called()
-    
-    def test_get_sftp_credentials_with_default_host(self, credential_manager):
+        saved = []
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({}))
+        monkeypatch.setattr("keyring.set_password", lambda *args: saved.append(args))
+        monkeypatch.setattr("getpass.getpass", lambda prompt="": 'test_pass')
+        _fake_input(monkeypatch, 'test.host.com', 'test_user', 'y')  # host, username, save choice
+
+        host, username, password = credential_manager.get_sftp_credentials()
+
+        assert host == 'test.host.com'
+        assert username == 'test_user'
+        assert password == 'test_pass'
+        assert saved
+
+    def test_get_sftp_credentials_with_default_host(self, credential_manager, monkeypatch):
         """Test SFTP credentials with default host."""
-        with patch('builtins.input') as mock_input, \
-             patch('getpass.getpass') as mock_getpass, \
-             patch('keyring.get_password', return_value=None):
-            
-            mock_input.side_effect = ['', 'test_user', 'n']  # empty host (use default), username, don't save
-            mock_getpass.return_value = 'test_pass'
-            
-            host, username, password = credential_manager.get_sftp_credentials(
-                default_host='default.host.com'
-            )
-            
-            assert host == 'default.host.com'
-            assert username == 'test_user'
-            assert password == 'test_pass'
-    
-    @patch('keyring.delete_password')
-    def test_clear_saved_credentials_db_only(self, mock_delete_password, credential_manager):
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({}))
+        monkeypatch.setattr("getpass.getpass", lambda prompt="": 'test_pass')
+        _fake_input(monkeypatch, '', 'test_user', 'n')  # empty host (use default), username, don't save
+
+        host, username, password = credential_manager.get_sftp_credentials(
+            default_host='default.host.com'
+        )
+
+        assert host == 'default.host.com'
+        assert username == 'test_user'
+        assert password == 'test_pass'
+
+    def test_clear_saved_credentials_db_only(self, credential_manager, monkeypatch):
         """Test clearing only DB credentials."""
+        deleted = []
+        monkeypatch.setattr("keyring.delete_password", lambda service, account: deleted.append(service))
+
         credential_manager.clear_saved_credentials('db')
-        
+
         # Should delete DB credentials but not SFTP
-        assert mock_delete_password.call_count == 2  # username and password
-        calls = mock_delete_password.call_args_list
-        assert any('_db' in str(call) for call in calls)
-        assert not any('_sftp' in str(call) for call in calls)
-    
-    @patch('keyring.delete_password')
-    def test_clear_saved_credentials_all(self, mock_delete_password, credential_manager):
+        assert len(deleted) == 2  # username and password
+        assert any(service.endswith('_db') for service in deleted)
+        assert not any(service.endswith('_sftp') for service in deleted)
+
+    def test_clear_saved_credentials_all(self, credential_manager, monkeypatch):
         """Test clearing all credentials."""
+        deleted = []
+        monkeypatch.setattr("keyring.delete_password", lambda service, account: deleted.append(service))
+
         credential_manager.clear_saved_credentials()
-        
+
         # Should delete both DB and SFTP credentials
-        assert mock_delete_password.call_count == 5  # 2 DB + 3 SFTP
-        calls = mock_delete_password.call_args_list
-        assert any('_db' in str(call) for call in calls)
-        assert any('_sftp' in str(call) for call in calls)
-    
-    @patch('builtins.input')
-    @patch('getpass.getpass')
-    def test_get_db_credentials_missing_username(self, mock_getpass, mock_input, credential_manager):
+        assert len(deleted) == 5  # 2 DB + 3 SFTP
+        assert any(service.endswith('_db') for service in deleted)
+        assert any(service.endswith('_sftp') for service in deleted)
+
+    def test_get_db_credentials_missing_username(self, credential_manager, monkeypatch):
         """Test error handling for missing username."""
-        mock_input.return_value = ''  # Empty username
-        mock_getpass.return_value = 'password'
-        
-        with patch.dict(os.environ, {}, clear=True), \
-             patch('keyring.get_password', return_value=None), \
-             pytest.raises(RuntimeError, match="DB credentials are required"):
+        monkeypatch.delenv("DB_UID", raising=False)
+        monkeypatch.delenv("DB_PWD", raising=False)
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({}))
+        monkeypatch.setattr("getpass.getpass", lambda prompt="": 'password')
+        _fake_input(monkeypatch, '')  # Empty username
+
+        with pytest.raises(RuntimeError, match="DB credentials are required"):
             credential_manager.get_db_credentials()
-    
-    @patch('builtins.input')
-    @patch('getpass.getpass')
-    def test_get_sftp_credentials_missing_password(self, mock_getpass, mock_input, credential_manager):
+
+    def test_get_sftp_credentials_missing_password(self, credential_manager, monkeypatch):
         """Test error handling for missing SFTP password."""
-        mock_input.side_effect = ['host.com', 'user']
-        mock_getpass.return_value = ''  # Empty password
-        
-        with patch('keyring.get_password', return_value=None), \
-             pytest.raises(RuntimeError, match="SFTP host/username/password are required"):
-            credential_manager.get_sftp_credentials()
\ No newline at end of file
+        monkeypatch.setattr("keyring.get_password", _fake_keyring({}))
+        monkeypatch.setattr("getpass.getpass", lambda prompt="": '')  # Empty password
+        _fake_input(monkeypatch, 'host.com', 'user')
+
+        with pytest.raises(RuntimeError, match="SFTP host/username/password are required"):
+            credential_manager.get_sftp_credentials()
@@ -2,12 +2,27 @@
 Tests for database management functionality.
 """
 
+import re
+from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 import pytest
 from sqlalchemy.exc import OperationalError
 
 from integration_tools.core.db_manager import DatabaseManager, RequestRow
-from integration_tools.models import DataRequestType, Request
+from integration_tools.models import DataRequestType, Request, RequestEmailNotification, XpsDistrictUpload
+
+
+_DIRPATH_RE = re.compile(r"du\.DirectoryPath IN \(:dir_0,:dir_1\)")
+_KEY_RE = re.compile(r"ufc\.\[key\] IN \(:k_0,:k_1\)")
+
+
+def _request(request_id, district_id=456, **fields):
+    """Build a minimal Request row for SQLite-backed tests."""
+    return Request(
+        RequestID=request_id, UserID=1, DataRequestTypeID=66, DistrictID=district_id,
+        IsDeleted=0, HasBeenMoved=0, **fields
+    )
 
 
 class TestDatabaseManager:
@@ -28,163 +43,152 @@ class TestDatabaseManager:
         # Password should be URL encoded
         assert conn_str.startswith("mssql+pyodbc://")
     
-    @patch('integration_tools.core.db_manager.create_engine')
-    @patch('integration_tools.core.db_manager.sessionmaker')
-    def test_get_session_context_manager(self, mock_sessionmaker, mock_create_engine, db_manager):
+    def test_get_session_context_manager(self, db_manager, patched_session):
         """Test database session context manager."""
-        mock_session = MagicMock()
-        mock_sessionmaker.return_value = MagicMock(return_value=mock_session)
-        
         with db_manager.get_session("user", "pass") as session:
-            assert session == mock_session
+            assert session is patched_session
         
-        mock_session.close.assert_called_once()
+        patched_session.close.assert_called_once()
     
-    def test_list_request_types_no_filter(self, db_manager, mock_db_session):
-        """Test listing request types without filter."""
-        # Test the method directly without complex mocking
-        # This tests the core logic of the method
-        result = db_manager.list_request_types(mock_db_session)
-        
-        # The method should return a list (even if empty due to no data)
-        assert isinstance(result, list)
+    @pytest.mark.parametrize("filter_arg,expected", [
+        (None, [(67, "PSAT Import"), (68, "Roster"), (66, "SAT Import")]),
+        ("sat", [(67, "PSAT Import"), (66, "SAT Import")]),  # Case-insensitive substring
+    ])
+    def test_list_request_types(self, db_manager, db_session, filter_arg, expected):
+        """Test listing request types ordered by name, with and without a filter."""
+        db_session.add_all([
+            DataRequestType(DataRequestTypeID=66, Name="SAT Import"),
+            DataRequestType(DataRequestTypeID=67, Name="PSAT Import"),
+            DataRequestType(DataRequestTypeID=68, Name="Roster"),
+        ])
+        db_session.flush()
         
-        # Verify the method handles the session parameter correctly
-        # (This is a basic smoke test)
-        assert True  # If we get here, the method executed without error
+        assert db_manager.list_request_types(db_session, filter_arg) == expected
     
-    def test_list_request_types_with_filter(self, db_manager, mock_db_session):
-        """Test listing request types with name filter."""
-        # Test the method with a filter parameter
-        result = db_manager.list_request_types(mock_db_session, "SAT")
+    def test_find_latest_requests_against_database(self, db_manager, db_session):
+        """Test that only the latest request per district and type is returned."""
+        db_session.add_all([
+            DataRequestType(DataRequestTypeID=66, Name="SAT Import"),
+            DataRequestType(DataRequestTypeID=67, Name="PSAT Import"),
+        ])
+        db_session.add_all([
+            Request(
+                RequestID=request_id, UserID=1, DataRequestTypeID=type_id, DistrictID=district_id,
+                Status=status, RequestTime=datetime(2024, 1, request_id), IsDeleted=0, HasBeenMoved=0
+            )
+            for request_id, district_id, type_id, status in [
+                (1, 456, 66, 5),
+                (2, 456, 66, 4),
+                (3, 456, 67, 5),
+                (4, 457, 66, 5),
+                (5, 457, 66, 1),  # Status not included by default
+            ]
+        ])
+        db_session.flush()
         
-        # The method should return a list (even if empty due to no data)
-        assert isinstance(result, list)
+        requests = db_manager.find_latest_requests(db_session, type_name_prefixes=["SAT"])
         
-        # Verify the method handles the filter parameter correctly
-        # (This is a basic smoke test)
-        assert True  # If we get here, the method executed without error
+        assert [r.RequestID for r in requests] == [4, 2]
+        assert requests[1].Status == 4
+        assert requests[0].DataRequestTypeName == "SAT Import"
     
-    def test_find_latest_requests_empty_result(self, db_manager, mock_db_session):
+    def test_find_latest_requests_empty_result(self, db_manager, db_session):
         """Test finding latest requests with no matching criteria."""
         requests = db_manager.find_latest_requests(
-            mock_db_session,
+            db_session,
             type_ids=[999]  # Non-existent type
         )
         assert len(requests) == 0
     
-    def test_get_email_content_found(self, db_manager, mock_db_session):
+    def test_get_email_content_found(self, db_manager, db_session):
         """Test getting email content when it exists."""
-        with patch.object(mock_db_session, 'query') as mock_query:
-            mock_result = MagicMock()
-            mock_result.EmailContent = "Test email content"
-            mock_result.FileAttachContent = "Test attachment"
-            
-            mock_query.return_value.filter.return_value.first.return_value = mock_result
-            
-            result = db_manager.get_email_content(mock_db_session, 123)
-            
-            assert result == ("Test email content", "Test attachment")
+        db_session.add(_request(123))
+        db_session.add(RequestEmailNotification(
+            ID=1, RequestID=123, EmailContent="Test email content", FileAttachContent="Test attachment"
+        ))
+        db_session.flush()
+        
+        result = db_manager.get_email_content(db_session, 123)
+        
+        assert result == ("Test email content", "Test attachment")
     
-    def test_get_email_content_not_found(self, db_manager, mock_db_session):
+    def test_get_email_content_not_found(self, db_manager, db_session):
         """Test getting email content when it doesn't exist."""
-        with patch.object(mock_db_session, 'query') as mock_query:
-            mock_query.return_value.filter.return_value.first.return_value = None
-            
-            result = db_manager.get_email_content(mock_db_session, 123)
-            
-            assert result is None
+        result = db_manager.get_email_content(db_session, 123)
+        
+        assert result is None
     
-    def test_get_directory_path_for_request_from_imported_filename(self, db_manager, mock_db_session):
+    def test_get_directory_path_for_request_from_imported_filename(self, db_manager, db_session):
         """Test getting directory path from ImportedFileName."""
-        with patch.object(mock_db_session, 'query') as mock_query:
-            mock_request = MagicMock()
-            mock_request.ImportedFileName = "test/path/file.csv"
-            mock_query.return_value.filter.return_value.first.return_value = mock_request
-            
-            result = db_manager.get_directory_path_for_request(mock_db_session, 123)
-            
-            assert result == "test/path/file.csv"
+        db_session.add(_request(123, ImportedFileName="test/path/file.csv"))
+        db_session.flush()
+        
+        result = db_manager.get_directory_path_for_request(db_session, 123)
+        
+        assert result == "test/path/file.csv"
+    
+    def test_get_directory_path_for_request_from_district_upload(self, db_manager, db_session):
+        """Test falling back to the district upload directory when ImportedFileName is empty."""
+        db_session.add(_request(123))
+        db_session.add(XpsDistrictUpload(xpsDistrictUploadID=1, DistrictID=456, DirectoryPath="district/456"))
+        db_session.flush()
+        
+        result = db_manager.get_directory_path_for_request(db_session, 123)
+        
+        assert result == "district/456"
     
-    def test_get_directory_path_for_request_not_found(self, db_manager, mock_db_session):
+    def test_get_directory_path_for_request_not_found(self, db_manager, db_session):
         """Test getting directory path when request doesn't exist."""
-        with patch.object(mock_db_session, 'query') as mock_query:
-            mock_query.return_value.filter.return_value.first.return_value = None
-            
-            result = db_manager.get_directory_path_for_request(mock_db_session, 123)
-            
-            assert result is None
+        result = db_manager.get_directory_path_for_request(db_session, 123)
+        
+        assert result is None
     
-    def test_clear_checksums(self, db_manager, mock_db_session):
-        """Test clearing checksums."""
-        with patch.object(mock_db_session, 'execute') as mock_execute, \
-             patch.object(mock_db_session, 'commit') as mock_commit:
-            
-            mock_result = MagicMock()
-            mock_result.rowcount = 5
-            mock_execute.return_value = mock_result
-            
-            result = db_manager.clear_checksums(mock_db_session, [123, 456])
-            
-            assert result == 5
-            mock_execute.assert_called_once()
-            mock_commit.assert_called_once()
-    
-    def test_bump_latest_queue(self, db_manager, mock_db_session):
-        """Test bumping latest queue."""
-        with patch.object(mock_db_session, 'execute') as mock_execute, \
-             patch.object(mock_db_session, 'commit') as mock_commit:
-            
-            mock_result = MagicMock()
-            mock_result.rowcount = 3
-            mock_execute.return_value = mock_result
-            
-            result = db_manager.bump_latest_queue(mock_db_session, [123, 456])
-            
-            assert result == 3
-            mock_execute.assert_called_once()
-            mock_commit.assert_called_once()
+    @pytest.mark.parametrize("method,rowcount", [
+        ("clear_checksums", 5),
+        ("bump_latest_queue", 3),
+    ])
+    def test_bulk_update(self, db_manager, mock_db_session, method, rowcount):
+        """Test that checksum clearing and queue bumping report rows affected and commit."""
+        mock_db_session.execute.return_value = SimpleNamespace(rowcount=rowcount)
+        
+        result = getattr(db_manager, method)(mock_db_session, [123, 456])
+        
+        assert result == rowcount
+        mock_db_session.execute.assert_called_once()
+        mock_db_session.commit.assert_called_once()
     
     def test_clear_checksums_with_directory_paths(self, db_manager, mock_db_session):
         """Test clearing checksums with directory path filter."""
-        with patch.object(mock_db_session, 'execute') as mock_execute:
-            mock_result = MagicMock()
-            mock_result.rowcount = 2
-            mock_execute.return_value = mock_result
-            
-            result = db_manager.clear_checksums(
-                mock_db_session, 
-                [123], 
-                directory_paths=["path1", "path2"]
-            )
-            
-            assert result == 2
-            # Verify that the SQL contains directory path conditions
-            call_args = mock_execute.call_args
-            sql_query = call_args[0][0]
-            assert "DirectoryPath" in str(sql_query)
+        mock_db_session.execute.return_value = SimpleNamespace(rowcount=2)
+        
+        result = db_manager.clear_checksums(
+            mock_db_session, 
+            [123], 
+            directory_paths=["path1", "path2"]
+        )
+        
+        assert result == 2
+        # Verify that the SQL contains directory path conditions
+        sql_query = mock_db_session.execute.call_args[0][0]
+        assert _DIRPATH_RE.search(str(sql_query))
     
     def test_clear_checksums_with_keys(self, db_manager, mock_db_session):
         """Test clearing checksums with specific keys."""
-        with patch.object(mock_db_session, 'execute') as mock_execute:
-            mock_result = MagicMock()
-            mock_result.rowcount = 1
-            mock_execute.return_value = mock_result
-            
-            result = db_manager.clear_checksums(
-                mock_db_session, 
-                [123], 
-                keys=["SAT", "PSAT"]
-            )
-            
-            assert result == 1
-            # Verify that the SQL contains key conditions
-            call_args = mock_execute.call_args
-            sql_query = call_args[0][0]
-            assert "[key]" in str(sql_query)
+        mock_db_session.execute.return_value = SimpleNamespace(rowcount=1)
+        
+        result = db_manager.clear_checksums(
+            mock_db_session, 
+            [123], 
+            keys=["SAT", "PSAT"]
+        )
+        
+        assert result == 1
+        # Verify that the SQL contains key conditions
+        sql_query = mock_db_session.execute.call_args[0][0]
+        assert _KEY_RE.search(str(sql_query))
     
     def test_get_session_with_real_connection_logic(self, db_manager):
-        """Test that the database manager can create connection strings and handle sessions."""
+        """Test that the database manager builds a complete connection string."""
         # Test connection string generation
         conn_str = db_manager._get_connection_string("test_user", "test_pass")
         assert "test_server" in conn_str
@@ -192,28 +196,42 @@ class TestDatabaseManager:
         assert "test_user" in conn_str
         assert "test_pass" in conn_str
         assert "mssql+pyodbc://" in conn_str
+    
+    def test_get_engine_is_cached_per_credentials(self):
+        """Test that one engine is created per credential pair and then reused."""
+        db_manager = DatabaseManager("test_server", "test_db")
         
-        # Test that the session context manager works (without actually connecting)
-        with patch('integration_tools.core.db_manager.create_engine') as mock_create_engine, \
-             patch('integration_tools.core.db_manager.sessionmaker') as mock_sessionmaker:
-            
-            mock_engine = MagicMock()
-            mock_create_engine.return_value = mock_engine
-            
-            mock_session_factory = MagicMock()
-            mock_sessionmaker.return_value = mock_session_factory
-            
-            mock_session = MagicMock()
-            mock_session_factory.return_value = mock_session
+        with patch('integration_tools.core.db_manager.create_engine') as mock_create_engine:
+            mock_create_engine.side_effect = lambda *args, **kwargs: MagicMock()
             
-            # Test the session context manager
-            with db_manager.get_session("test_user", "test_pass") as session:
-                assert session == mock_session
-                # Verify the connection string was used
-                mock_create_engine.assert_called_once()
-                call_args = mock_create_engine.call_args[0][0]
-                assert "test_server" in call_args
-                assert "test_db" in call_args
+            engine = db_manager._get_engine("test_user", "test_pass")
+            assert db_manager._get_engine("test_user", "test_pass") is engine
+            assert db_manager._get_engine("other_user", "test_pass") is not engine
             
-            # Verify session was closed
-            mock_session.close.assert_called_once()
\ No newline at end of file
+            assert mock_create_engine.call_count == 2
+            conn_str = mock_create_engine.call_args_list[0][0][0]
+            assert "test_server" in conn_str
+            assert "test_db" in conn_str
+    
+    def test_warm_pool_opens_and_returns_connections(self):
+        """Test that warm_pool opens up to pool_size connections and closes them back into the pool."""
+        db_manager = DatabaseManager("test_server", "test_db", pool_size=3)
+        mock_engine = MagicMock()
+        
+        with patch.object(db_manager, '_get_engine', return_value=mock_engine):
+            opened = db_manager.warm_pool("test_user", "test_pass", connections=5)
+        
+        assert opened == 3
+        assert mock_engine.connect.call_count == 3
+        assert mock_engine.connect.return_value.close.call_count == 3
+
+
+class TestRequestRow:
+    """Test cases for RequestRow."""
+    
+    def test_iso_time_properties(self):
+        """Test that request times are exposed as ISO strings."""
+        row = RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime(2024, 1, 2, 3, 4, 5))
+        
+        assert row.request_time_iso == "2024-01-02T03:04:05"
+        assert row.request_time_est_iso is None
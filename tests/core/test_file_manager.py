@@ -3,55 +3,156 @@ Tests for file management functionality.
 """
 
 import os
-import tempfile
-from unittest.mock import patch, MagicMock, mock_open
+import socket
+from collections import namedtuple
+from types import SimpleNamespace
+from typing import Tuple
+from unittest.mock import call, patch, MagicMock, sentinel
 import pytest
-import paramiko
 
-from integration_tools.core.file_manager import FileManager
-from integration_tools.core.error_handling import SFTPConnectionError, FileOperationError
+# Every SFTP and filesystem call in these tests is mocked, so nothing is written here.
+_LOCAL_DIR = "/tmp/test"
+
+# Plain stand-ins for paramiko's stat results and SFTPAttributes; only these fields are read
+_Stat = namedtuple("_Stat", "st_mode")
+_Attr = namedtuple("_Attr", "filename st_mode")
+_DIR_STAT = _Stat(0o40000)
+_FILE_STAT = _Stat(0o100644)
+
+
+def _dir_attr(filename):
+    """Listing entry for a remote directory."""
+    return _Attr(filename, _DIR_STAT.st_mode)
+
+
+def _file_attr(filename):
+    """Listing entry for a regular remote file."""
+    return _Attr(filename, _FILE_STAT.st_mode)
+
+
+_RAW_DIR = "LinkIt/ETLProcessedFolder/001"
+_BACKUP_DIR = "LinkIt/BackupData/ETLProcessedFolder/001"
+
+_RAW_GET_CALLS = [
+    call(f"{_RAW_DIR}/123_test_folder/{name}", os.path.join(_LOCAL_DIR, name))
+    for name in ("file1.csv", "file2.txt")
+]
+
+
+class FakeSFTP:
+    """In-memory SFTP client serving directory listings from a {path: [entries]} tree."""
+    
+    def __init__(self, tree):
+        self._tree = tree
+        self.get = MagicMock()
+        self.open = MagicMock()
+        self.stat = MagicMock()
+    
+    def listdir_attr(self, path):
+        try:
+            return self._tree[path]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+    
+    def listdir(self, path):
+        return [entry.filename for entry in self.listdir_attr(path)]
+
+
+def _files(*names):
+    """Listing entries for regular files."""
+    return [_file_attr(name) for name in names]
+
+
+# Connection errors are built once and reused across the parametrized failure cases
+_CONN_FAIL = Exception("Connection failed")
+_TIMEOUT = socket.timeout("timed out")
+
+_PATH_CASES: Tuple[Tuple[str, str], ...] = (
+    ("F:\\FTProot\\Districts\\State\\District\\File.csv", "/Districts/State/District/File.csv"),
+    ("F:/FTProot/Districts/State/District/File.csv", "/Districts/State/District/File.csv"),
+    ("Districts\\State\\District\\File.csv", "/Districts/State/District/File.csv"),
+    ("C:\\somewhere\\ftproot\\Districts\\Test\\file.txt", "/Districts/Test/file.txt"),
+    ("", "/"),
+    ("no_districts_path", "/no_districts_path"),
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _paramiko_patch():
+    """Patch paramiko.SSHClient once for the whole module."""
+    with patch("paramiko.SSHClient") as ssh_class:
+        yield ssh_class
+
+
+@pytest.fixture
+def paramiko_ssh(_paramiko_patch):
+    """Fresh mock SSH client returned by the patched paramiko.SSHClient."""
+    _paramiko_patch.reset_mock()
+    mock_ssh = MagicMock()
+    _paramiko_patch.return_value = mock_ssh
+    return mock_ssh
+
+
+@pytest.fixture
+def fs_mocks(monkeypatch):
+    """Mock the filesystem, tar and zstd calls made while extracting a backup file."""
+    mocks = SimpleNamespace(
+        makedirs=MagicMock(), move=MagicMock(), rmtree=MagicMock(), tar=MagicMock(), zstd=MagicMock()
+    )
+    for name, obj in [
+        ("os.makedirs", mocks.makedirs),
+        ("shutil.move", mocks.move),
+        ("shutil.rmtree", mocks.rmtree),
+        ("tarfile.open", mocks.tar),
+        ("integration_tools.core.file_manager.zstd", mocks.zstd),
+    ]:
+        monkeypatch.setattr(name, obj)
+    return mocks
 
 
 class TestFileManager:
     """Test cases for FileManager."""
     
-    def test_init(self):
+    def test_init(self, shared_fm):
         """Test file manager initialization."""
-        fm = FileManager()
-        assert fm._sftp_client is None
-        assert fm._ssh_client is None
+        assert shared_fm._sftp_client is None
+        assert shared_fm._ssh_client is None
     
-    @patch('paramiko.SSHClient')
-    def test_create_sftp_connection_success(self, mock_ssh_class, file_manager):
+    def test_create_sftp_connection_success(self, file_manager, paramiko_ssh):
         """Test successful SFTP connection creation."""
-        mock_ssh = MagicMock()
-        mock_sftp = MagicMock()
-        mock_ssh.open_sftp.return_value = mock_sftp
-        mock_ssh_class.return_value = mock_ssh
+        paramiko_ssh.open_sftp.return_value = sentinel.sftp
         
         result = file_manager.create_sftp_connection("test.host.com", "user", "pass")
         
-        assert result == mock_sftp
-        assert file_manager._ssh_client == mock_ssh
-        assert file_manager._sftp_client == mock_sftp
-        mock_ssh.set_missing_host_key_policy.assert_called_once()
-        mock_ssh.connect.assert_called_once_with("test.host.com", port=22, username="user", password="pass")
+        assert result is sentinel.sftp
+        assert file_manager._ssh_client == paramiko_ssh
+        assert file_manager._sftp_client is sentinel.sftp
+        paramiko_ssh.set_missing_host_key_policy.assert_called_once()
+        paramiko_ssh.connect.assert_called_once_with("test.host.com", port=22, username="user", password="pass")
+    
+    @pytest.mark.parametrize("error", [_CONN_FAIL, _TIMEOUT])
+    def test_create_sftp_connection_failure(self, file_manager, paramiko_ssh, error):
+        """Test that SFTP connection errors are re-raised unchanged."""
+        paramiko_ssh.connect.side_effect = error
+        
+        with pytest.raises(type(error)) as excinfo:
+            file_manager.create_sftp_connection("test.host.com", "user", "pass")
+        assert excinfo.value is error
     
-    @patch('paramiko.SSHClient')
-    def test_create_sftp_connection_failure(self, mock_ssh_class, file_manager):
-        """Test SFTP connection creation failure."""
-        mock_ssh = MagicMock()
-        mock_ssh.connect.side_effect = Exception("Connection failed")
-        mock_ssh_class.return_value = mock_ssh
+    def test_create_sftp_connection_auth_failure(self, file_manager, paramiko_ssh):
+        """Test that paramiko authentication errors are re-raised unchanged."""
+        import paramiko
+        
+        paramiko_ssh.connect.side_effect = paramiko.AuthenticationException("Authentication failed")
         
-        with pytest.raises(Exception, match="Connection failed"):
+        with pytest.raises(paramiko.AuthenticationException, match="Authentication failed"):
             file_manager.create_sftp_connection("test.host.com", "user", "pass")
     
     def test_close_connection(self, file_manager):
         """Test closing SFTP connection."""
         # Mock the clients
-        mock_sftp = MagicMock()
-        mock_ssh = MagicMock()
+        mock_sftp = MagicMock(spec=['close'])
+        mock_ssh = MagicMock(spec=['close'])
         file_manager._sftp_client = mock_sftp
         file_manager._ssh_client = mock_ssh
         
@@ -62,31 +163,21 @@ class TestFileManager:
         assert file_manager._sftp_client is None
         assert file_manager._ssh_client is None
     
-    def test_context_manager(self, file_manager):
+    def test_context_manager(self, shared_fm):
         """Test FileManager as context manager."""
-        with patch.object(file_manager, 'close_connection') as mock_close:
-            with file_manager as fm:
-                assert fm == file_manager
+        with patch.object(shared_fm, 'close_connection') as mock_close:
+            with shared_fm as fm:
+                assert fm == shared_fm
             mock_close.assert_called_once()
     
-    def test_db_windows_path_to_remote_sftp_path(self, file_manager):
+    @pytest.mark.parametrize("input_path,expected", _PATH_CASES)
+    def test_db_windows_path_to_remote_sftp_path(self, shared_fm, input_path, expected):
         """Test converting Windows DB path to SFTP path."""
-        test_cases = [
-            ("F:\\FTProot\\Districts\\State\\District\\File.csv", "/Districts/State/District/File.csv"),
-            ("F:/FTProot/Districts/State/District/File.csv", "/Districts/State/District/File.csv"),
-            ("Districts\\State\\District\\File.csv", "/Districts/State/District/File.csv"),
-            ("C:\\somewhere\\ftproot\\Districts\\Test\\file.txt", "/Districts/Test/file.txt"),
-            ("", "/"),
-            ("no_districts_path", "/no_districts_path")
-        ]
-        
-        for input_path, expected in test_cases:
-            result = file_manager.db_windows_path_to_remote_sftp_path(input_path)
-            assert result == expected, f"Failed for input: {input_path}"
+        assert shared_fm.db_windows_path_to_remote_sftp_path(input_path) == expected
     
     def test_ensure_remote_directory_exists_already_exists(self, file_manager, mock_sftp_client):
         """Test ensuring remote directory exists when it already exists."""
-        mock_sftp_client.stat.return_value = True  # Directory exists
+        mock_sftp_client.stat.return_value = _DIR_STAT  # Directory exists
         
         result = file_manager.ensure_remote_directory_exists(mock_sftp_client, "/test/path")
         
@@ -105,134 +196,119 @@ class TestFileManager:
         assert result is True
         assert mock_sftp_client.mkdir.call_count >= 1
     
-    def test_download_requestid_raw_files_success(self, file_manager, mock_sftp_client, temp_dir):
+    def test_download_requestid_raw_files_success(self, file_manager):
         """Test successful download of raw files."""
-        # Mock the first listdir call (listing the main directory)
-        mock_sftp_client.listdir.return_value = ["123_test_folder", "other_folder"]
-        mock_sftp_client.stat.return_value = MagicMock(st_mode=0o40000)  # Directory
-        
-        # Mock the second listdir call (listing files in the request directory)
-        def listdir_side_effect(path):
-            if "123_test_folder" in path:
-                return ["file1.csv", "file2.txt", "file3.log"]
-            return ["123_test_folder", "other_folder"]  # Default for first call
-        
-        mock_sftp_client.listdir.side_effect = listdir_side_effect
+        sftp = FakeSFTP({
+            _RAW_DIR: [_dir_attr("123_test_folder"), _dir_attr("other_folder")],
+            f"{_RAW_DIR}/123_test_folder": _files("file1.csv", "file2.txt", "file3.log"),
+        })
         
-        success, count, message = file_manager.download_requestid_raw_files(
-            mock_sftp_client, 123, temp_dir
-        )
+        success, count, message = file_manager.download_requestid_raw_files(sftp, 123, _LOCAL_DIR)
         
         assert success is True
         assert count == 2  # Only CSV and TXT files
         assert "Successfully downloaded" in message
-        assert mock_sftp_client.get.call_count == 2
+        assert sftp.get.mock_calls == _RAW_GET_CALLS
+        sftp.stat.assert_not_called()
     
-    def test_download_requestid_raw_files_no_directory(self, file_manager, mock_sftp_client, temp_dir):
+    def test_download_requestid_raw_files_no_directory(self, file_manager):
         """Test download when no matching directory exists."""
-        mock_sftp_client.listdir.return_value = ["456_other_folder", "789_another"]
+        sftp = FakeSFTP({_RAW_DIR: [_dir_attr("456_other_folder"), _dir_attr("789_another")]})
         
-        success, count, message = file_manager.download_requestid_raw_files(
-            mock_sftp_client, 123, temp_dir
-        )
+        success, count, message = file_manager.download_requestid_raw_files(sftp, 123, _LOCAL_DIR)
         
         assert success is False
         assert count == 0
         assert "No directory found starting with 123" in message
     
-    def test_download_requestid_raw_files_no_csv_files(self, file_manager, mock_sftp_client, temp_dir):
+    def test_download_requestid_raw_files_skips_matching_file(self, file_manager):
+        """Test that a regular file matching the RequestID is not treated as the directory."""
+        sftp = FakeSFTP({_RAW_DIR: _files("123_backup.tar.zst")})
+        
+        success, count, message = file_manager.download_requestid_raw_files(sftp, 123, _LOCAL_DIR)
+        
+        assert success is False
+        assert "No directory found starting with 123" in message
+    
+    def test_download_requestid_raw_files_no_csv_files(self, file_manager):
         """Test download when directory exists but no CSV/TXT files."""
-        mock_sftp_client.listdir.side_effect = [
-            ["123_test_folder"],  # First call - list main directory
-            ["file1.log", "file2.xml"]  # Second call - list files in request directory
-        ]
-        mock_sftp_client.stat.return_value = MagicMock(st_mode=0o40000)  # Directory
+        sftp = FakeSFTP({
+            _RAW_DIR: [_dir_attr("123_test_folder")],
+            f"{_RAW_DIR}/123_test_folder": _files("file1.log", "file2.xml"),
+        })
         
-        success, count, message = file_manager.download_requestid_raw_files(
-            mock_sftp_client, 123, temp_dir
-        )
+        success, count, message = file_manager.download_requestid_raw_files(sftp, 123, _LOCAL_DIR)
         
         assert success is False
         assert count == 0
         assert "No CSV or TXT files found" in message
     
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('os.makedirs')
-    @patch('shutil.move')
-    @patch('tarfile.open')
-    def test_download_requestid_backup_file_success(self, mock_tar_open, mock_shutil_move, 
-                                                  mock_makedirs, mock_file_open, 
-                                                  file_manager, mock_sftp_client, temp_dir):
+    def test_download_requestid_backup_file_success(self, file_manager, fs_mocks):
         """Test successful download and extraction of backup file."""
-        # Mock zstandard
-        with patch('integration_tools.core.file_manager.zstd') as mock_zstd:
-            mock_decompressor = MagicMock()
-            mock_zstd.ZstdDecompressor.return_value = mock_decompressor
-            
-            mock_sftp_client.listdir.return_value = ["123_backup.tar.zst", "other_file.txt"]
-            
-            # Mock tar file contents
-            mock_member = MagicMock()
-            mock_member.name = "test_file.csv"
-            mock_tar = MagicMock()
-            mock_tar.getmembers.return_value = [mock_member]
-            mock_tar_open.return_value.__enter__.return_value = mock_tar
-            
-            success, count, message = file_manager.download_requestid_backup_file(
-                mock_sftp_client, 123, temp_dir
-            )
-            
-            assert success is True
-            assert count == 1
-            assert "Successfully processed" in message
-            mock_sftp_client.get.assert_called_once()
-            mock_decompressor.copy_stream.assert_called_once()
+        mock_decompressor = MagicMock()
+        fs_mocks.zstd.ZstdDecompressor.return_value = mock_decompressor
+        
+        sftp = FakeSFTP({_BACKUP_DIR: _files("123_backup.tar.zst", "other_file.txt")})
+        
+        # Mock tar file contents
+        mock_member = MagicMock()
+        mock_member.name = "test_file.csv"
+        mock_tar = MagicMock()
+        mock_tar.__iter__.return_value = iter([mock_member])
+        fs_mocks.tar.return_value.__enter__.return_value = mock_tar
+        
+        success, count, message = file_manager.download_requestid_backup_file(sftp, 123, _LOCAL_DIR)
+        
+        assert success is True
+        assert count == 1
+        assert "Successfully processed" in message
+        sftp.open.assert_called_once_with(f"{_BACKUP_DIR}/123_backup.tar.zst", "rb", bufsize=1 << 20)
+        sftp.get.assert_not_called()
+        mock_decompressor.stream_reader.assert_called_once()
+        assert fs_mocks.tar.call_args.kwargs["mode"] == "r|"
+        fs_mocks.move.assert_called_once()
+        fs_mocks.rmtree.assert_called_once()
     
-    def test_download_requestid_backup_file_no_zstd(self, file_manager, mock_sftp_client, temp_dir):
+    def test_download_requestid_backup_file_no_zstd(self, file_manager, mock_sftp_client):
         """Test backup file download when zstandard is not available."""
         with patch('integration_tools.core.file_manager.zstd', None):
             success, count, message = file_manager.download_requestid_backup_file(
-                mock_sftp_client, 123, temp_dir
+                mock_sftp_client, 123, _LOCAL_DIR
             )
             
             assert success is False
             assert count == 0
             assert "zstandard library is required" in message
     
-    def test_download_requestid_backup_file_not_found(self, file_manager, mock_sftp_client, temp_dir):
+    def test_download_requestid_backup_file_not_found(self, file_manager):
         """Test backup file download when file doesn't exist."""
-        mock_sftp_client.listdir.return_value = ["456_backup.tar.zst", "other_file.txt"]
+        sftp = FakeSFTP({_BACKUP_DIR: _files("456_backup.tar.zst", "other_file.txt")})
         
-        success, count, message = file_manager.download_requestid_backup_file(
-            mock_sftp_client, 123, temp_dir
-        )
+        success, count, message = file_manager.download_requestid_backup_file(sftp, 123, _LOCAL_DIR)
         
         assert success is False
         assert count == 0
         assert "No .tar.zst file found for 123" in message
     
+    @pytest.mark.parametrize("ids,raw_outcomes,backup_outcomes,expected", [
+        # Raw folder hit for 123; 456 falls back to its backup archive
+        ([123, 456], [(True, 2, "Success"), (False, 0, "No files")], [(True, 1, "Backup success")],
+         {123: (True, 2), 456: (True, 1)}),
+        # Both sources miss
+        ([123], [(False, 0, "No files")], [(False, 0, "No backup")], {123: (False, 0)}),
+        # Every raw folder hit, so backups are never tried
+        ([1, 2, 3], [(True, 1, "Success")] * 3, [], {1: (True, 1), 2: (True, 1), 3: (True, 1)}),
+    ])
     @patch('os.makedirs')
-    def test_download_files_for_requests_success(self, mock_makedirs, file_manager, mock_sftp_client):
-        """Test downloading files for multiple requests."""
-        with patch.object(file_manager, 'download_requestid_raw_files') as mock_download_raw, \
-             patch.object(file_manager, 'download_requestid_backup_file') as mock_download_backup:
-            
-            # Mock successful download for first request
-            mock_download_raw.side_effect = [
-                (True, 2, "Success"),  # Request 123
-                (False, 0, "No files")  # Request 456 - will try backup
-            ]
-            mock_download_backup.return_value = (True, 1, "Backup success")  # Request 456 backup
-            
-            results = file_manager.download_files_for_requests(
-                mock_sftp_client, [123, 456], "/tmp/test"
-            )
-            
-            assert len(results) == 2
-            assert results[123]["success"] is True
-            assert results[123]["files_downloaded"] == 2
-            assert results[456]["success"] is True
-            assert results[456]["files_downloaded"] == 1
+    def test_download_files_for_requests_success(self, mock_makedirs, file_manager, mock_sftp_client,
+                                                 ids, raw_outcomes, backup_outcomes, expected):
+        """Test downloading files for multiple requests, falling back to backups."""
+        with patch.object(file_manager, 'download_requestid_raw_files', side_effect=raw_outcomes), \
+             patch.object(file_manager, 'download_requestid_backup_file', side_effect=backup_outcomes) as mock_backup:
+            results = file_manager.download_files_for_requests(mock_sftp_client, ids, _LOCAL_DIR)
+        
+        assert {rid: (r["success"], r["files_downloaded"]) for rid, r in results.items()} == expected
+        assert mock_backup.call_count == len(backup_outcomes)
     
     def test_download_files_for_requests_directory_creation_failure(self, file_manager, mock_sftp_client):
         """Test download failure when directory creation fails."""
@@ -0,0 +1,17 @@
+"""
+Tests for request manager functionality.
+"""
+
+
+class TestRequestManager:
+    """Test cases for RequestManager."""
+
+    def test_credentials_are_cached(self, request_manager, mock_credentials, mock_sftp_credentials):
+        """Test that DB and SFTP credentials are fetched once and then cached."""
+        stub = request_manager.credential_manager
+        for _ in range(2):
+            assert request_manager.get_db_credentials() == mock_credentials
+            assert request_manager.get_sftp_credentials() == mock_sftp_credentials
+
+        assert stub.db_calls == 1
+        assert stub.sftp_calls == 1
@@ -0,0 +1 @@
+"""Legacy module tests."""
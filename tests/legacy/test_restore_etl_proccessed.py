@@ -0,0 +1,446 @@
+"""
+Tests for the legacy ETL-processed file restore.
+"""
+
+import io
+import logging
+import stat
+import tarfile
+import threading
+import time
+from types import SimpleNamespace
+
+import paramiko
+import pytest
+import zstandard as zstd
+
+from integration_tools.legacy import restore_etl_proccessed as restore
+
+_LIVE = "LinkIt/ETLProcessedFolder/001"
+_BACKUP = "LinkIt/BackupData/ETLProcessedFolder/001"
+
+
+class FakeServer:
+    """
+    In-memory SFTP server that doubles as the SSH transport: each session is a FakeSFTP,
+    and opening more than max_sessions fails like OpenSSH's MaxSessions limit.
+    """
+
+    def __init__(self, dirs=(), files=None, max_sessions=10, fail_paths=()):
+        self.dirs = set(dirs)
+        self.files = dict(files or {})
+        self.fail_paths = set(fail_paths)
+        self.listed = []
+        self.max_sessions = max_sessions
+        self.sessions = 0
+        self.peak_sessions = 0
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def open_session(self):
+        with self.lock:
+            if self.sessions >= self.max_sessions:
+                raise paramiko.ChannelException(1, "Administratively prohibited")
+            self.sessions += 1
+            self.opened += 1
+            self.peak_sessions = max(self.peak_sessions, self.sessions)
+        return FakeSFTP(self)
+
+    def is_active(self):
+        return True
+
+
+class _FakeFile(io.BytesIO):
+    """SFTPFile stand-in; writes land in the server's files when closed."""
+
+    def __init__(self, client, path, data=b""):
+        super().__init__(data)
+        self.client = client
+        self.path = path
+        self.writable_ = not data
+
+    def prefetch(self, size=None):
+        pass
+
+    def set_pipelined(self, pipelined=True):
+        pass
+
+    def read(self, size=-1):
+        with self.client.busy():
+            return super().read(size)
+
+    def write(self, data):
+        with self.client.busy():
+            return super().write(data)
+
+    def close(self):
+        if not self.closed and self.writable_:
+            self.client.server.files[self.path] = self.getvalue()
+        super().close()
+
+
+class FakeSFTP:
+    """One SFTP session on a FakeServer; fails if two threads use it at the same time."""
+
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+        self._guard = threading.Lock()
+
+    def busy(self):
+        if not self._guard.acquire(blocking=False):
+            raise RuntimeError("SFTP session used from two threads at once")
+        time.sleep(0.0005)  # Widen the window for overlapping use
+        return _Release(self._guard)
+
+    def get_channel(self):
+        return SimpleNamespace(get_transport=lambda: self.server)
+
+    def listdir_attr(self, path):
+        self.server.listed.append(path)
+        if path not in self.server.dirs:
+            raise IOError(f"No such directory: {path}")
+        entries = {}
+        for p in self.server.dirs | set(self.server.files):
+            parent, _, name = p.rpartition("/")
+            if parent == path:
+                is_dir = p in self.server.dirs
+                entries[name] = SimpleNamespace(
+                    filename=name,
+                    st_mode=stat.S_IFDIR if is_dir else stat.S_IFREG,
+                    st_size=None if is_dir else len(self.server.files[p]),
+                )
+        return list(entries.values())
+
+    def stat(self, path):
+        if path not in self.server.dirs and path not in self.server.files:
+            raise IOError(f"No such file: {path}")
+        return SimpleNamespace(st_mode=stat.S_IFDIR if path in self.server.dirs else stat.S_IFREG)
+
+    def mkdir(self, path):
+        self.server.dirs.add(path)
+
+    def open(self, path, mode="r", bufsize=-1):
+        with self.busy():
+            if path in self.server.fail_paths:
+                raise IOError(f"Permission denied: {path}")
+            if "w" in mode:
+                return _FakeFile(self, path)
+            if path not in self.server.files:
+                raise IOError(f"No such file: {path}")
+            return _FakeFile(self, path, self.server.files[path])
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            with self.server.lock:
+                self.server.sessions -= 1
+
+
+class _Release:
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+@pytest.fixture(autouse=True)
+def _sessions_from_fake_transport(monkeypatch):
+    """Open extra SFTP channels on the fake server instead of a real transport."""
+    monkeypatch.setattr(paramiko.SFTPClient, "from_transport", lambda transport: transport.open_session())
+
+
+class FakeTransport(FakeServer):
+    """paramiko.Transport stand-in for get_sftp, serving sessions from an empty FakeServer."""
+
+    instances = []
+
+    def __init__(self, sock):
+        super().__init__()
+        self.sock = sock
+        self.packetizer = SimpleNamespace()
+        self.active = True
+        self.credentials = None
+        FakeTransport.instances.append(self)
+
+    def use_compression(self, compress=True):
+        pass
+
+    def set_keepalive(self, interval):
+        pass
+
+    def connect(self, username=None, password=None, pkey=None):
+        if password == "wrong":
+            raise paramiko.AuthenticationException("Authentication failed.")
+        self.credentials = (username, password)
+
+    def is_active(self):
+        return self.active
+
+    def close(self):
+        self.active = False
+
+
+@pytest.fixture
+def fake_transport(monkeypatch):
+    """Make get_sftp build FakeTransports on a dummy socket, with an empty connection pool."""
+    FakeTransport.instances = []
+    monkeypatch.setattr(restore, "_sftp_pool", {})
+    monkeypatch.setattr(restore, "_open_tuned_socket", lambda hostname: ("sock", hostname))
+    monkeypatch.setattr(paramiko, "Transport", FakeTransport)
+    return FakeTransport
+
+
+def _archive(members):
+    """A .tar.zst archive of {name: bytes}."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return zstd.ZstdCompressor().compress(buf.getvalue())
+
+
+def _archive_server(members, **kwargs):
+    """Server whose backup ETL folder holds request 123's archive of members."""
+    files = {f"{_BACKUP}/123_upload.tar.zst": _archive(members)}
+    return FakeServer(dirs={_LIVE, _BACKUP}, files=files, **kwargs)
+
+
+def _raw_server(count, **kwargs):
+    """Server with count CSV files in a live ETL folder for request 123."""
+    folder = f"{_LIVE}/123_upload"
+    files = {f"{folder}/f{i}.csv": f"row,{i}\n".encode() for i in range(count)}
+    return FakeServer(dirs={_LIVE, _BACKUP, folder}, files=files, **kwargs)
+
+
+@pytest.fixture
+def fake_process(monkeypatch):
+    """Replace the per-request restore with an instant success that logs like the real one."""
+    def process(sftp_client, request_id, target_dir, local_tmp_dir="tmp"):
+        restore.log.info(f"Found {request_id}.tar.zst")
+        return True, 1, "ok"
+    monkeypatch.setattr(restore, "process_requestid_file", process)
+
+
+class TestRestoreOutput:
+    """Test cases for restore_for_requestids output handling."""
+
+    def test_logs_through_application_config(self, fake_process, caplog):
+        """Test that unmuted calls log at INFO and the module leaves levels and output to the app."""
+        with caplog.at_level(logging.INFO):
+            restore.restore_for_requestids(None, {1: "/target"})
+
+        assert restore.log.level == logging.NOTSET
+        assert [type(h) for h in restore.log.handlers] == [logging.NullHandler]
+        messages = [r.getMessage() for r in caplog.records]
+        assert messages[:2] == ["Processing RequestID: 1", "Target directory: /target"]
+        assert "Result: ok" in messages
+
+    def test_mute_is_per_call(self, fake_process, caplog):
+        """Test that overlapping muted calls neither leak output nor change the logger level."""
+        level = restore.log.level
+        barrier = threading.Barrier(4)
+
+        def muted():
+            barrier.wait()
+            restore.restore_for_requestids(None, {2: "/muted"}, mute_output=True)
+
+        with caplog.at_level(logging.INFO, logger=restore.log.name):
+            threads = [threading.Thread(target=muted) for _ in range(3)]
+            for t in threads:
+                t.start()
+            barrier.wait()
+            restore.restore_for_requestids(None, {1: "/target"})
+            for t in threads:
+                t.join()
+
+        assert restore.log.level == level
+        messages = [r.getMessage() for r in caplog.records]
+        assert "Processing RequestID: 1" in messages
+        assert not [m for m in messages if "RequestID: 2" in m or "/muted" in m or "Found 2" in m]
+
+
+class TestRawFileCopy:
+    """Test cases for process_requestid_raw_files."""
+
+    def test_copies_all_files_when_sessions_run_out(self):
+        """Test that workers share the caller's session once the server refuses new channels."""
+        server = _raw_server(20, max_sessions=3)
+        client = server.open_session()
+
+        ok, moved, message = restore.process_requestid_raw_files(client, 123, "/target")
+
+        assert (ok, moved) == (True, 20), message
+        assert server.files["/target/f9.csv"] == b"row,9\n"
+
+    def test_worker_errors_are_collected(self):
+        """Test that failed copies are reported together while the rest still complete."""
+        server = _raw_server(5, fail_paths={"/target/f1.csv", "/target/f3.csv"})
+
+        ok, moved, message = restore.process_requestid_raw_files(server.open_session(), 123, "/target")
+
+        assert (ok, moved) == (False, 3)
+        assert sorted(message.split(": ", 1)[1].split("; ")) == [
+            "Failed to move f1.csv: Permission denied: /target/f1.csv",
+            "Failed to move f3.csv: Permission denied: /target/f3.csv",
+        ]
+
+    def test_worker_count_stays_under_session_limit(self):
+        """Test that a large folder opens no more sessions than OpenSSH allows by default."""
+        server = _raw_server(40)
+        client = server.open_session()
+
+        ok, moved, _ = restore.process_requestid_raw_files(client, 123, "/target")
+
+        assert (ok, moved) == (True, 40)
+        assert server.peak_sessions <= 8
+
+
+class TestArchiveRestore:
+    """Test cases for process_requestid_file."""
+
+    def test_buffered_members_stay_within_byte_budget(self, monkeypatch):
+        """Test that in-memory members are bounded by bytes held, not by member count."""
+        peak = 0
+
+        class TrackedBudget(restore._ByteBudget):
+            def acquire(self, size):
+                nonlocal peak
+                super().acquire(size)
+                with self._cond:
+                    peak = max(peak, self._used)
+
+        monkeypatch.setattr(restore, "_ByteBudget", TrackedBudget)
+        monkeypatch.setattr(restore, "_MAX_BUFFERED_BYTES", 3000)
+        members = {f"data/f{i}.csv": bytes([65 + i % 26]) * 1000 for i in range(30)}
+        server = _archive_server(members)
+
+        ok, moved, message = restore.process_requestid_file(server.open_session(), 123, "/target")
+
+        assert (ok, moved) == (True, 30), message
+        assert 0 < peak <= 3000
+        assert server.files["/target/f29.csv"] == members["data/f29.csv"]
+
+    def test_streams_members_into_target(self):
+        """Test that regular archive members are written flat into target_dir and dirs are skipped."""
+        members = {"data/a.csv": b"a,1\n", "data/nested/b.txt": b"b", "c.csv": b""}
+        server = _archive_server(members)
+
+        ok, moved, message = restore.process_requestid_file(server.open_session(), 123, "/target")
+
+        assert (ok, moved, message) == (True, 3, "Successfully processed 3 files")
+        assert {p: server.files[p] for p in server.files if p.startswith("/target/")} == {
+            "/target/a.csv": b"a,1\n", "/target/b.txt": b"b", "/target/c.csv": b""
+        }
+
+    def test_large_members_and_exhausted_sessions(self, monkeypatch):
+        """Test inline uploads of large members while workers share the caller's session."""
+        monkeypatch.setattr(restore, "_MAX_BUFFERED_MEMBER_SIZE", 100)
+        members = {f"f{i}.csv": bytes([48 + i]) * (50 if i % 2 else 500) for i in range(10)}
+        server = _archive_server(members, max_sessions=2)
+
+        ok, moved, message = restore.process_requestid_file(server.open_session(), 123, "/target")
+
+        assert (ok, moved) == (True, 10), message
+        assert all(server.files[f"/target/{name}"] == data for name, data in members.items())
+
+    def test_upload_errors_are_reported_per_file(self):
+        """Test that a failed upload is reported while the other members still land."""
+        server = _archive_server({"a.csv": b"a", "b.csv": b"b"}, fail_paths={"/target/b.csv"})
+
+        ok, moved, message = restore.process_requestid_file(server.open_session(), 123, "/target")
+
+        assert (ok, moved) == (False, 1)
+        assert message == "Completed with errors: Failed to upload b.csv: Permission denied: /target/b.csv"
+
+    def test_missing_archive(self):
+        """Test the message restore_for_requestids uses to fall back to raw files."""
+        server = FakeServer(dirs={_LIVE, _BACKUP})
+
+        ok, moved, message = restore.process_requestid_file(server.open_session(), 123, "/target")
+
+        assert (ok, moved) == (False, 0)
+        assert message.startswith("No .tar.zst file found for 123")
+
+
+class TestFindFirstEntry:
+    """Test cases for _find_first_entry."""
+
+    @pytest.mark.parametrize("wanted, expected, listed", [
+        pytest.param("1_", (_LIVE, "1_a"), [_LIVE], id="first_dir_match"),
+        pytest.param("2_", (_BACKUP, "2_b"), [_LIVE, "missing", _BACKUP], id="later_dir_match"),
+        pytest.param("3_", None, [_LIVE, "missing", _BACKUP], id="no_match"),
+    ])
+    def test_lists_directories_only_until_a_match(self, wanted, expected, listed):
+        """Test that later directories are listed only when earlier ones had no match."""
+        server = FakeServer(dirs={_LIVE, _BACKUP, f"{_LIVE}/1_a", f"{_BACKUP}/2_b"})
+        remote_dir, entry = restore._find_first_entry(
+            server.open_session(), [_LIVE, "missing", _BACKUP], lambda e: e.filename.startswith(wanted)
+        )
+
+        assert (None if entry is None else (remote_dir, entry.filename)) == expected
+        assert server.listed == listed
+        assert server.opened == 1
+
+
+class TestSftpPool:
+    """Test cases for get_sftp and close_all."""
+
+    def test_reuses_live_connection(self, fake_transport):
+        """Test that repeated calls for the same host and user share one connection."""
+        first = restore.get_sftp("host", "user", password="pw")
+        second = restore.get_sftp("host", "user", password="pw")
+
+        assert second is first
+        assert len(fake_transport.instances) == 1
+        assert fake_transport.instances[0].credentials == ("user", "pw")
+
+    def test_reconnects_when_transport_drops(self, fake_transport):
+        """Test that a dropped transport is replaced on the next call."""
+        first = restore.get_sftp("host", "user", password="pw")
+        fake_transport.instances[0].active = False
+
+        second = restore.get_sftp("host", "user", password="pw")
+
+        assert second is not first
+        assert len(fake_transport.instances) == 2
+
+    def test_close_all_closes_and_empties_pool(self, fake_transport):
+        """Test that close_all closes clients and transports, so the next call reconnects."""
+        sftp = restore.get_sftp("host", "user", password="pw")
+
+        restore.close_all()
+
+        assert sftp.closed and not fake_transport.instances[0].active
+        assert restore.get_sftp("host", "user", password="pw") is not sftp
+
+    def test_failed_login_is_not_pooled(self, fake_transport):
+        """Test that a failed login closes its transport and leaves nothing pooled."""
+        with pytest.raises(paramiko.AuthenticationException):
+            restore.get_sftp("host", "user", password="wrong")
+
+        assert not fake_transport.instances[0].active
+        assert restore._sftp_pool == {}
+
+
+def test_open_tuned_socket_uses_create_connection(monkeypatch):
+    """Test that sockets are connected with a timeout via create_connection, then tuned."""
+    opts = []
+    sock = SimpleNamespace(setsockopt=lambda *args: opts.append(args), close=lambda: None)
+    connects = []
+
+    def create_connection(*args, **kwargs):
+        connects.append((args, kwargs))
+        return sock
+
+    monkeypatch.setattr(restore.socket, "create_connection", create_connection)
+
+    assert restore._open_tuned_socket("sftp.example.com") is sock
+    assert connects == [((("sftp.example.com", 22),), {"timeout": 30})]
+    assert (restore.socket.IPPROTO_TCP, restore.socket.TCP_NODELAY, 1) in opts
@@ -0,0 +1,115 @@
+"""
+Tests for school mapping utilities.
+"""
+
+import json
+
+import pytest
+
+from integration_tools import school_mapping
+from integration_tools.models import DistrictDataParm, School
+from integration_tools.school_mapping import interactive_school_mapping_fix
+
+
+@pytest.fixture
+def mapping_db(db_session, monkeypatch):
+    """
+    SQLite session with two active schools, one inactive, and two SIS configs for district 456.
+    Commits are counted in session.commits, and any input() prompt fails the test.
+    """
+    db_session.add_all([
+        School(SchoolID=10, DistrictID=456, Name="North High", Code="NHS", Status=1),
+        School(SchoolID=11, DistrictID=456, Name="South High", Code="SHS", Status=1),
+        School(SchoolID=12, DistrictID=456, Name="Old High", Code="OHS", Status=0),
+        DistrictDataParm(
+            DistrictDataParmID=1, DistrictID=456, DataSetOriginID=1, DataSetCategoryID=1,
+            ImportType="Roster", JSONDataConfig=json.dumps({"sis": {"schools": {"X0": 10}}}),
+        ),
+        DistrictDataParm(
+            DistrictDataParmID=2, DistrictID=456, DataSetOriginID=1, DataSetCategoryID=1,
+            ImportType="Enrollment", JSONDataConfig=None,
+        ),
+    ])
+    db_session.flush()
+
+    real_commit = db_session.commit
+
+    def commit():
+        db_session.commits.append(1)
+        real_commit()
+
+    db_session.commits = []
+    monkeypatch.setattr(db_session, "commit", commit)
+    monkeypatch.setattr("builtins.input", lambda prompt="": pytest.fail(f"Unexpected prompt: {prompt}"))
+    return db_session
+
+
+def _mappings(db):
+    """School mappings per import type, read back from the stored (non-empty) configs."""
+    return {
+        parm.ImportType: json.loads(parm.JSONDataConfig)["sis"]["schools"]
+        for parm in db.query(DistrictDataParm).filter(DistrictDataParm.DistrictID == 456)
+        if parm.JSONDataConfig is not None
+    }
+
+
+class TestMappingOverrides:
+    """Test cases for non-interactive school mapping via mapping_overrides."""
+
+    def test_applies_overrides_by_id_and_code(self, mapping_db):
+        """Test that overrides resolve SchoolIDs and Codes and update every record in one commit."""
+        ok = interactive_school_mapping_fix(
+            mapping_db, 456, ["Roster", "Enrollment"], "$.sis.schools", "SIS",
+            mapping_overrides={"X1": 11, 2: "NHS"},
+        )
+
+        assert ok is True
+        assert _mappings(mapping_db) == {
+            "Roster": {"X0": 10, "X1": 11, "2": 10},
+            "Enrollment": {"X1": 11, "2": 10},
+        }
+        assert mapping_db.commits == [1]
+
+    def test_skips_unknown_targets(self, mapping_db, capsys):
+        """Test that unknown or inactive schools are skipped while the rest still apply."""
+        ok = interactive_school_mapping_fix(
+            mapping_db, 456, ["Roster"], "$.sis.schools", "SIS",
+            mapping_overrides={"X1": 99, "X2": "OHS", "X3": "SHS"},
+        )
+
+        out = capsys.readouterr().out
+        assert ok is True
+        assert _mappings(mapping_db)["Roster"] == {"X0": 10, "X3": 11}
+        assert "Unknown LinkIt school '99' for 'X1', skipping" in out
+        assert "Unknown LinkIt school 'OHS' for 'X2', skipping" in out
+
+    def test_nothing_to_apply_leaves_records_untouched(self, mapping_db):
+        """Test that when no override resolves, no record changes and nothing is committed."""
+        ok = interactive_school_mapping_fix(
+            mapping_db, 456, ["Roster", "Enrollment"], "$.sis.schools", "SIS",
+            mapping_overrides={"X1": 99},
+        )
+
+        assert ok is False
+        assert mapping_db.commits == []
+        roster, enrollment = (
+            mapping_db.get(DistrictDataParm, parm_id).JSONDataConfig for parm_id in (1, 2)
+        )
+        assert (json.loads(roster), enrollment) == ({"sis": {"schools": {"X0": 10}}}, None)
+
+    @pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "stdlib"])
+    def test_stored_config_text_does_not_depend_on_orjson(self, mapping_db, monkeypatch, use_orjson):
+        """Test that written configs are stdlib json.dumps text whether or not orjson is installed."""
+        if use_orjson:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(school_mapping, "orjson", None)
+        mapping_db.get(DistrictDataParm, 1).JSONDataConfig = json.dumps({"sis": {"schools": {"Zoë": 10}}})
+
+        interactive_school_mapping_fix(
+            mapping_db, 456, ["Roster"], "$.sis.schools", "SIS", mapping_overrides={"X1": 11},
+        )
+
+        assert mapping_db.get(DistrictDataParm, 1).JSONDataConfig == (
+            '{"sis": {"schools": {"Zo\\u00eb": 10, "X1": 11}}}'
+        )
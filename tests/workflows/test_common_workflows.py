@@ -2,299 +2,434 @@
 Tests for common workflows functionality.
 """
 
+import copy
+import functools
+import pickle
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
+from dataclasses import FrozenInstanceError
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import call
 
+from integration_tools.workflows import common_workflows
 from integration_tools.workflows.common_workflows import CommonWorkflows, WorkflowResult
 from integration_tools.core.db_manager import RequestRow
 from datetime import datetime
 
+_NOW = datetime(2024, 1, 1, 0, 0, 0)
+
+_SAT_ROW = RequestRow(123, 456, 66, "SAT", "test_path", 5, _NOW)
+SAMPLE_SAT_PSAT = (_SAT_ROW, RequestRow(124, 457, 67, "PSAT", "test_path2", 5, _NOW))
+SAT_PSAT_TWO = (_SAT_ROW, RequestRow(124, 456, 67, "PSAT", "test_path2", 5, _NOW))
+SAT_ROWS_BY_DISTRICT = {
+    456: (_SAT_ROW,),
+    457: (RequestRow(124, 457, 66, "SAT", "test_path2", 5, _NOW), _SAT_ROW),
+}
+# Enough rows for the monitoring workflow to take its pandas path
+PANDAS_SAMPLE = tuple(
+    RequestRow(1000 + i, 450 + i % 7, 66, ["SAT", "PSAT", "ACT"][i % 3], "p", 4 if i % 5 == 0 else 5, _NOW)
+    for i in range(common_workflows._PANDAS_MIN_REQUESTS)
+)
+
+
+# Read-only keyword arguments shared by the workflow calls
+QUIET_KW = MappingProxyType({"show_progress": False})
+BASE_DISTRICT_KW = MappingProxyType({"district_ids": [456], "show_progress": False})
+
+
+@functools.lru_cache(maxsize=1)
+def _default_workflows():
+    """CommonWorkflows with its default manager, built once per process."""
+    return CommonWorkflows()
+
+
+def _subset(d, keys):
+    """The entries of d for the given keys."""
+    return {k: d[k] for k in keys}
+
+
+def _configure(mgr, case):
+    """Apply a case's find/rerun/restore/download results to the fake manager."""
+    mgr.find = case.get("find", ())
+    mgr.rerun = case.get("rerun")
+    mgr.restore = case.get("restore", {})
+    mgr.download = case.get("download", {})
+
+
+DISTRICT_REFRESH_CASES = [
+    pytest.param({
+        "find": SAT_PSAT_TWO,
+        "restore": {123: {"success": True, "files_moved": 2}, 124: {"success": True, "files_moved": 1}},
+        "rerun": {"request_ids": [123, 124], "checksums_deleted": 5, "queues_updated": 2},
+        "kwargs": {"type_names": ["SAT", "PSAT"], "delete_checksums": True, "restore_files": True},
+        "success": True,
+        "steps": (3, 3),
+        "message": "Successfully completed district refresh",
+        "data": {"requests_found": 2, "request_ids": [123, 124]},
+        "restore_calls": [
+            call.restore_files_batch([123, 124], max_concurrent=3, show_progress=False, chunk_size=4)
+        ],
+        "called": {"find_requests", "rerun_requests", "restore_files_batch"},
+    }, id="success"),
+    pytest.param({
+        "find": (),
+        "kwargs": {},
+        "success": False,
+        "steps": (0, 3),
+        "message": "No requests found",
+        "data": {"requests_found": 0},
+        "restore_calls": [],
+        "called": {"find_requests"},
+    }, id="no_requests"),
+    pytest.param({
+        "find": (_SAT_ROW,),
+        "rerun": {"request_ids": [123], "checksums_deleted": 2, "queues_updated": 1},
+        "kwargs": {"restore_files": False},
+        "success": True,
+        "steps": (2, 2),  # No restore step
+        "message": "Successfully completed district refresh",
+        "data": {"requests_found": 1, "request_ids": [123]},
+        "restore_calls": [],
+        "called": {"find_requests", "rerun_requests"},
+    }, id="without_restore"),
+    pytest.param({
+        "find": Exception("Database error"),
+        "kwargs": {},
+        "success": False,
+        "steps": (0, 3),
+        "message": "Workflow failed at step 1: Database error",
+        "data": {},
+        "restore_calls": [],
+        "called": {"find_requests"},
+    }, id="exception"),
+]
+
+BULK_DOWNLOAD_CASES = [
+    pytest.param({
+        "find": SAMPLE_SAT_PSAT,
+        "download": {123: {"success": True, "files_downloaded": 3}, 124: {"success": True, "files_downloaded": 2}},
+        "kwargs": {"type_names": ["SAT", "PSAT"], "district_ids": [456, 457]},
+        "success": True,
+        "steps": (2, 2),
+        "message": "Downloaded 5 files from 2/2 requests",
+        "data": {
+            "requests_found": 2,
+            "summary": {"total_requests": 2, "successful_requests": 2, "total_files_downloaded": 5},
+        },
+        "called": {"find_requests", "download_files_batch"},
+    }, id="success"),
+    pytest.param({
+        "find": (),
+        "kwargs": {"type_names": ["SAT"]},
+        "success": False,
+        "steps": (0, 2),
+        "message": "No requests found",
+        "data": {"type_names": ["SAT"]},
+        "called": {"find_requests"},
+    }, id="no_requests"),
+    pytest.param({
+        "find": (_SAT_ROW, RequestRow(124, 457, 67, "SAT", "test_path2", 5, _NOW)),
+        "download": {
+            123: {"success": True, "files_downloaded": 3},
+            124: {"success": False, "files_downloaded": 0, "message": "SFTP error"}
+        },
+        "kwargs": {"type_names": ["SAT"]},
+        "success": True,
+        "steps": (2, 2),
+        "message": "Downloaded 3 files from 1/2 requests",
+        "data": {"summary": {"total_requests": 2, "successful_requests": 1, "total_files_downloaded": 3}},
+        "called": {"find_requests", "download_files_batch"},
+    }, id="partial_success"),
+]
+
+MONITORING_CASES = [
+    pytest.param({
+        "find": SAT_PSAT_TWO + (  # Both successful
+            RequestRow(125, 457, 66, "SAT", "test_path3", 4, _NOW),  # Failed
+            RequestRow(126, 457, 67, "PSAT", "test_path4", 5, _NOW),  # Success
+        ),
+        "kwargs": {"integration_types": ["SAT", "PSAT"]},
+        "message": "75.0% success rate",
+        "data": {
+            "total_requests": 4,
+            "success_rate": 75.0,  # 3/4 successful
+            "summary": {
+                "healthy_districts": 1,  # District 456 has no failures
+                "districts_with_issues": 1,
+                "most_problematic_type": "SAT",
+            },
+        },
+        "analysis": {
+            "by_status": {"success": 3, "failed": 1},
+            "districts_with_failures": [457],
+        },
+        "failed_ids": [125],
+        "called": {"find_requests"},
+    }, id="mixed"),
+    pytest.param({
+        "find": (),
+        "kwargs": {},
+        "message": "No recent requests found",
+        "data": {"requests_found": 0},
+        "analysis": {},
+        "failed_ids": [],
+        "called": {"find_requests"},
+    }, id="no_requests"),
+    pytest.param({
+        "find": SAMPLE_SAT_PSAT,
+        "kwargs": {},
+        "message": "100.0% success rate",
+        "data": {
+            "success_rate": 100.0,
+            "summary": {"healthy_districts": 2, "districts_with_issues": 0, "most_problematic_type": "SAT"},
+        },
+        "analysis": {
+            "by_status": {"success": 2, "failed": 0},
+            "districts_with_failures": [],
+        },
+        "failed_ids": [],
+        "called": {"find_requests"},
+    }, id="all_successful"),
+]
+
+
+class FakeManager:
+    """
+    Request manager stand-in with RequestManager's sync lookups and AsyncRequestManager's async batches.
+    
+    ``find`` may be a sequence of rows, an exception to raise, or a callable taking the
+    find_requests keyword arguments. Every call is recorded in ``calls``.
+    """
+    __slots__ = ("find", "rerun", "restore", "download", "calls")
+    
+    def __init__(self, find=(), rerun=None, restore=None, download=None):
+        self.find = find
+        self.rerun = rerun
+        self.restore = restore or {}
+        self.download = download or {}
+        self.calls = []
+    
+    def calls_to(self, name):
+        """Recorded calls to the named method, in call order."""
+        return [c for c in self.calls if c[0] == name]
+    
+    def find_requests(self, **criteria):
+        self.calls.append(call.find_requests(**criteria))
+        if isinstance(self.find, Exception):
+            raise self.find
+        if callable(self.find):
+            return self.find(**criteria)
+        return self.find
+    
+    def rerun_requests(self, *args, **kwargs):
+        self.calls.append(call.rerun_requests(*args, **kwargs))
+        return self.rerun
+    
+    async def restore_files_batch(self, request_ids, **kwargs):
+        self.calls.append(call.restore_files_batch(request_ids, **kwargs))
+        return self.restore
+    
+    async def download_files_batch(self, request_ids, **kwargs):
+        self.calls.append(call.download_files_batch(request_ids, **kwargs))
+        return self.download
+
+
+@pytest.fixture(name="wf")
+def wf_fixture():
+    """Fake request manager and the workflows using it."""
+    mgr = FakeManager()
+    return SimpleNamespace(mgr=mgr, wf=CommonWorkflows(mgr))
+
 
 class TestCommonWorkflows:
     """Test cases for CommonWorkflows."""
     
     def test_init(self):
         """Test workflow initialization."""
-        workflows = CommonWorkflows()
-        assert workflows.request_manager is not None
+        assert _default_workflows().request_manager is not None
     
     def test_init_with_custom_manager(self):
         """Test workflow initialization with custom request manager."""
-        mock_manager = MagicMock()
-        workflows = CommonWorkflows(mock_manager)
-        assert workflows.request_manager == mock_manager
+        manager = object()
+        workflows = CommonWorkflows(manager)
+        assert workflows.request_manager is manager
     
-    @pytest.mark.asyncio
-    async def test_district_refresh_workflow_success(self):
-        """Test successful district refresh workflow."""
-        mock_manager = AsyncMock()
-        
-        # Mock request finding (this is a sync method, not async)
-        sample_requests = [
-            RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime.now()),
-            RequestRow(124, 456, 67, "PSAT", "test_path2", 5, datetime.now())
-        ]
-        # Use sync_spec to properly mock the sync method
-        mock_manager.find_requests = MagicMock(return_value=sample_requests)
-        
-        # Mock restore files (this is async)
-        mock_manager.restore_files_batch.return_value = {
-            123: {"success": True, "files_moved": 2},
-            124: {"success": True, "files_moved": 1}
-        }
-        
-        # Mock rerun (this is sync)
-        mock_manager.rerun_requests = MagicMock(return_value={
-            "request_ids": [123, 124],
-            "checksums_deleted": 5,
-            "queues_updated": 2
-        })
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.district_refresh_workflow(
-            district_ids=[456],
-            type_names=["SAT", "PSAT"],
-            delete_checksums=True,
-            restore_files=True,
-            show_progress=False
-        )
-        
-        assert result.success is True
-        assert result.steps_completed == 3
-        assert result.total_steps == 3
-        assert "Successfully completed district refresh" in result.message
-        assert result.data["requests_found"] == 2
-        assert result.data["request_ids"] == [123, 124]
+    @pytest.mark.parametrize("case", DISTRICT_REFRESH_CASES)
+    async def test_district_refresh_workflow(self, wf, case):
+        """Test district refresh outcomes: full run, no requests, no restore, and failure."""
+        _configure(wf.mgr, case)
+        
+        result = await wf.wf.district_refresh_workflow(**BASE_DISTRICT_KW, **case["kwargs"])
+        
+        assert result.success is case["success"]
+        assert (result.steps_completed, result.total_steps) == case["steps"]
+        assert case["message"] in result.message
+        assert _subset(result.data, case["data"]) == case["data"]
+        assert {c[0] for c in wf.mgr.calls} == case["called"]
+        assert wf.mgr.calls_to("restore_files_batch") == case["restore_calls"]
     
-    @pytest.mark.asyncio
-    async def test_district_refresh_workflow_no_requests(self):
-        """Test district refresh workflow when no requests are found."""
-        mock_manager = AsyncMock()
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=[])
+    @pytest.mark.parametrize("case", BULK_DOWNLOAD_CASES)
+    async def test_bulk_file_download_workflow(self, wf, case):
+        """Test bulk download outcomes: full success, no requests, and partial success."""
+        _configure(wf.mgr, case)
+        
+        result = await wf.wf.bulk_file_download_workflow(**QUIET_KW, **case["kwargs"])
+        
+        assert result.success is case["success"]
+        assert (result.steps_completed, result.total_steps) == case["steps"]
+        assert case["message"] in result.message
+        assert _subset(result.data, case["data"]) == case["data"]
+        assert "request_details" not in result.data  # Only added on request
+        assert {c[0] for c in wf.mgr.calls} == case["called"]
+    
+    @pytest.mark.parametrize("case", MONITORING_CASES)
+    async def test_integration_monitoring_workflow(self, wf, case):
+        """Test monitoring outcomes: mixed statuses, no requests, and all successful."""
+        _configure(wf.mgr, case)
         
-        workflows = CommonWorkflows(mock_manager)
+        result = await wf.wf.integration_monitoring_workflow(**QUIET_KW, **case["kwargs"])
         
-        result = await workflows.district_refresh_workflow(
-            district_ids=[456],
-            show_progress=False
-        )
-        
-        assert result.success is False
-        assert "No requests found" in result.message
-        assert result.steps_completed == 0
-        assert result.data["requests_found"] == 0
+        assert result.success is True
+        assert case["message"] in result.message
+        assert _subset(result.data, case["data"]) == case["data"]
+        analysis = result.data.get("analysis", {})
+        assert _subset(analysis, case["analysis"]) == case["analysis"]
+        assert [r["RequestID"] for r in analysis.get("failed_requests", [])] == case["failed_ids"]
+        assert {c[0] for c in wf.mgr.calls} == case["called"]
     
-    @pytest.mark.asyncio
-    async def test_district_refresh_workflow_without_restore(self):
-        """Test district refresh workflow without file restore."""
-        mock_manager = AsyncMock()
-        
-        sample_requests = [
-            RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime.now())
-        ]
-        # Mock the sync methods properly
-        mock_manager.find_requests = MagicMock(return_value=sample_requests)
-        mock_manager.rerun_requests = MagicMock(return_value={
+    async def test_district_refresh_workflow_step_labels(self, wf, capsys):
+        """Test that step labels are numbered by phase and read correctly."""
+        mock_manager = wf.mgr
+        mock_manager.find = (_SAT_ROW,)
+        mock_manager.rerun = {
             "request_ids": [123],
             "checksums_deleted": 2,
             "queues_updated": 1
-        })
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.district_refresh_workflow(
+        }
+
+        workflows = wf.wf
+
+        await workflows.district_refresh_workflow(
             district_ids=[456],
+            delete_checksums=True,
             restore_files=False,
-            show_progress=False
+            show_progress=True
         )
-        
-        assert result.success is True
-        assert result.steps_completed == 2
-        assert result.total_steps == 2  # No restore step
-        mock_manager.restore_files_batch.assert_not_called()
-    
-    @pytest.mark.asyncio
-    async def test_district_refresh_workflow_exception(self):
-        """Test district refresh workflow with exception."""
-        mock_manager = AsyncMock()
-        # Mock the sync method to raise an exception
-        mock_manager.find_requests = MagicMock(side_effect=Exception("Database error"))
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.district_refresh_workflow(
-            district_ids=[456],
-            show_progress=False
-        )
-        
-        assert result.success is False
-        assert "Workflow failed at step 1" in result.message
-        assert "Database error" in result.message
-        assert result.steps_completed == 0
-    
-    @pytest.mark.asyncio
-    async def test_bulk_file_download_workflow_success(self):
-        """Test successful bulk file download workflow."""
-        mock_manager = AsyncMock()
-        
-        sample_requests = [
-            RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime.now()),
-            RequestRow(124, 457, 67, "PSAT", "test_path2", 5, datetime.now())
-        ]
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=sample_requests)
-        
-        # Mock download results
-        mock_manager.download_files_batch.return_value = {
-            123: {"success": True, "files_downloaded": 3},
-            124: {"success": True, "files_downloaded": 2}
+
+        out = capsys.readouterr().out
+        assert "Step 1: Finding latest requests..." in out
+        assert "Step 2: Rerunning requests with checksum deletion..." in out
+
+    async def test_bulk_file_download_workflow_queries_each_district(self, wf):
+        """Test that district lookups run per district and duplicates are dropped."""
+        mock_manager = wf.mgr
+        mock_manager.find = lambda district_ids, **kwargs: SAT_ROWS_BY_DISTRICT[district_ids[0]]
+        mock_manager.download = {
+            123: {"success": True, "files_downloaded": 1},
+            124: {"success": True, "files_downloaded": 1}
         }
         
-        workflows = CommonWorkflows(mock_manager)
+        workflows = wf.wf
         
         result = await workflows.bulk_file_download_workflow(
-            type_names=["SAT", "PSAT"],
+            type_names=["SAT"],
             district_ids=[456, 457],
-            show_progress=False
+            **QUIET_KW
         )
         
         assert result.success is True
-        assert result.steps_completed == 2
-        assert result.total_steps == 2
-        assert "Downloaded 5 files from 2/2 requests" in result.message
-        assert result.data["summary"]["successful_requests"] == 2
-        assert result.data["summary"]["total_files_downloaded"] == 5
-    
-    @pytest.mark.asyncio
-    async def test_bulk_file_download_workflow_no_requests(self):
-        """Test bulk file download workflow with no matching requests."""
-        mock_manager = AsyncMock()
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=[])
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.bulk_file_download_workflow(
-            type_names=["SAT"],
-            show_progress=False
-        )
-        
-        assert result.success is False
-        assert "No requests found" in result.message
-        assert result.steps_completed == 0
-        assert result.data["type_names"] == ["SAT"]
-    
-    @pytest.mark.asyncio
-    async def test_bulk_file_download_workflow_partial_success(self):
-        """Test bulk file download workflow with partial success."""
-        mock_manager = AsyncMock()
-        
-        sample_requests = [
-            RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime.now()),
-            RequestRow(124, 457, 67, "SAT", "test_path2", 5, datetime.now())
-        ]
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=sample_requests)
-        
-        # Mock partial download success
-        mock_manager.download_files_batch.return_value = {
-            123: {"success": True, "files_downloaded": 3},
-            124: {"success": False, "files_downloaded": 0, "message": "SFTP error"}
+        assert _subset(result.data["summary"], ("successful_requests", "total_requests")) == {
+            "successful_requests": 2, "total_requests": 2
         }
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.bulk_file_download_workflow(
+        find_calls = mock_manager.calls_to("find_requests")
+        assert len(find_calls) == 2
+        called_districts = sorted(c.kwargs["district_ids"] for c in find_calls)
+        assert called_districts == [[456], [457]]
+
+    async def test_bulk_file_download_workflow_orders_districts_newest_first(self, wf):
+        """Test that merged district lookups come back newest RequestTime first."""
+        by_district = {
+            456: (
+                RequestRow(1, 456, 66, "SAT", "p", 5, datetime(2024, 1, 1)),
+                RequestRow(2, 456, 66, "SAT", "p", 5, None),
+            ),
+            457: (
+                RequestRow(3, 457, 66, "SAT", "p", 5, datetime(2024, 1, 3)),
+                RequestRow(4, 457, 66, "SAT", "p", 5, datetime(2024, 1, 2)),
+            ),
+        }
+        wf.mgr.find = lambda district_ids, **kwargs: by_district[district_ids[0]]
+        wf.mgr.download = {i: {"success": True, "files_downloaded": 1} for i in range(1, 5)}
+
+        result = await wf.wf.bulk_file_download_workflow(
             type_names=["SAT"],
-            show_progress=False
+            district_ids=[456, 457],
+            include_request_details=True,
+            **QUIET_KW
         )
+
+        assert [d["RequestID"] for d in result.data["request_details"]] == [3, 4, 1, 2]
+
+    async def test_integration_monitoring_workflow_pandas_matches_loop(self, wf, monkeypatch):
+        """Test that the pandas analysis gives the same report as the plain loop."""
+        pytest.importorskip("pandas")
         
-        assert result.success is True
-        assert result.data["summary"]["successful_requests"] == 1
-        assert result.data["summary"]["total_requests"] == 2
-        assert result.data["summary"]["total_files_downloaded"] == 3
-    
-    @pytest.mark.asyncio
-    async def test_integration_monitoring_workflow_success(self):
-        """Test successful integration monitoring workflow."""
-        mock_manager = AsyncMock()
+        wf.mgr.find = PANDAS_SAMPLE
+        workflows = wf.wf
         
-        # Mock requests with mixed statuses
-        sample_requests = [
-            RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime.now()),  # Success
-            RequestRow(124, 456, 67, "PSAT", "test_path2", 5, datetime.now()),  # Success
-            RequestRow(125, 457, 66, "SAT", "test_path3", 4, datetime.now()),  # Failed
-            RequestRow(126, 457, 67, "PSAT", "test_path4", 5, datetime.now()),  # Success
-        ]
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=sample_requests)
+        with_pandas = await workflows.integration_monitoring_workflow(**QUIET_KW)
+        monkeypatch.setattr(common_workflows, "pd", None)
+        without_pandas = await workflows.integration_monitoring_workflow(**QUIET_KW)
         
-        workflows = CommonWorkflows(mock_manager)
+        assert with_pandas.success is True
+        assert with_pandas.data == without_pandas.data
+    
+    async def test_integration_monitoring_workflow_pandas_tallies_missing_keys(self, wf, monkeypatch):
+        """Test that rows with no district or type are tallied under None, as the plain loop does."""
+        pytest.importorskip("pandas")
         
-        result = await workflows.integration_monitoring_workflow(
-            integration_types=["SAT", "PSAT"],
-            show_progress=False
+        wf.mgr.find = PANDAS_SAMPLE + (
+            RequestRow(1, None, 66, "SAT", "p", 4, _NOW),
+            RequestRow(2, 450, 66, None, "p", 5, _NOW),
         )
+        workflows = wf.wf
         
-        assert result.success is True
-        assert result.data["total_requests"] == 4
-        assert result.data["success_rate"] == 75.0  # 3/4 successful
-        
-        # Check analysis details
-        analysis = result.data["analysis"]
-        assert analysis["by_status"]["success"] == 3
-        assert analysis["by_status"]["failed"] == 1
-        assert len(analysis["failed_requests"]) == 1
-        assert 457 in analysis["districts_with_failures"]  # District with failed request
+        with_pandas = await workflows.integration_monitoring_workflow(**QUIET_KW)
+        monkeypatch.setattr(common_workflows, "pd", None)
+        without_pandas = await workflows.integration_monitoring_workflow(**QUIET_KW)
         
-        # Check summary
-        summary = result.data["summary"]
-        assert summary["healthy_districts"] == 1  # District 456 has no failures
-        assert summary["districts_with_issues"] == 1  # District 457 has failures
+        assert with_pandas.success is True, with_pandas.message
+        assert with_pandas.data == without_pandas.data
+        assert with_pandas.data["analysis"]["by_district"][None] == {"success": 0, "failed": 1}
+        assert with_pandas.data["analysis"]["by_type"][None] == {"success": 1, "failed": 0}
     
-    @pytest.mark.asyncio
-    async def test_integration_monitoring_workflow_no_requests(self):
-        """Test integration monitoring workflow with no requests."""
-        mock_manager = AsyncMock()
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=[])
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.integration_monitoring_workflow(
-            show_progress=False
-        )
-        
-        assert result.success is True
-        assert "No recent requests found" in result.message
-        assert result.data["requests_found"] == 0
+    async def test_find_requests_cached_within_ttl(self, wf):
+        """Test that lookups are uncached by default and reuse rows once a TTL is set."""
+        mock_manager = wf.mgr
+        mock_manager.find = (_SAT_ROW,)
+        
+        await wf.wf.integration_monitoring_workflow(**QUIET_KW)
+        await wf.wf.integration_monitoring_workflow(**QUIET_KW)
+        assert len(mock_manager.calls_to("find_requests")) == 2
+        
+        cached = CommonWorkflows(mock_manager, find_cache_ttl=60)
+        await cached.integration_monitoring_workflow(**QUIET_KW)
+        await cached.integration_monitoring_workflow(**QUIET_KW)
+        assert len(mock_manager.calls_to("find_requests")) == 3
     
-    @pytest.mark.asyncio
-    async def test_integration_monitoring_workflow_all_successful(self):
-        """Test integration monitoring workflow with all successful requests."""
-        mock_manager = AsyncMock()
-        
-        sample_requests = [
-            RequestRow(123, 456, 66, "SAT", "test_path", 5, datetime.now()),
-            RequestRow(124, 457, 67, "PSAT", "test_path2", 5, datetime.now()),
+    async def test_district_refresh_invalidates_find_cache(self, wf):
+        """Test that a rerun drops cached rows so later lookups see updated statuses."""
+        wf.mgr.find = (_SAT_ROW,)
+        wf.mgr.rerun = {"request_ids": [123], "checksums_deleted": 0, "queues_updated": 1}
+        cached = CommonWorkflows(wf.mgr, find_cache_ttl=60)
+        
+        await cached.integration_monitoring_workflow(**QUIET_KW)
+        await cached.district_refresh_workflow(**BASE_DISTRICT_KW, restore_files=False)
+        await cached.integration_monitoring_workflow(**QUIET_KW)
+        
+        assert [c[0] for c in wf.mgr.calls] == [
+            "find_requests", "find_requests", "rerun_requests", "find_requests"
         ]
-        # Mock the sync method properly
-        mock_manager.find_requests = MagicMock(return_value=sample_requests)
-        
-        workflows = CommonWorkflows(mock_manager)
-        
-        result = await workflows.integration_monitoring_workflow(
-            show_progress=False
-        )
-        
-        assert result.success is True
-        assert result.data["success_rate"] == 100.0
-        assert result.data["analysis"]["by_status"]["failed"] == 0
-        assert len(result.data["analysis"]["districts_with_failures"]) == 0
-        assert result.data["summary"]["districts_with_issues"] == 0
-
+    
 
 class TestWorkflowResult:
     """Test cases for WorkflowResult dataclass."""
@@ -309,8 +444,31 @@ class TestWorkflowResult:
             total_steps=3
         )
         
-        assert result.success is True
-        assert result.message == "Test message"
-        assert result.data == {"key": "value"}
-        assert result.steps_completed == 2
-        assert result.total_steps == 3
\ No newline at end of file
+        assert result == WorkflowResult(True, "Test message", {"key": "value"}, 2, 3)
+    
+    def test_workflow_result_is_immutable(self):
+        """Test that WorkflowResult fields can't be reassigned or extended."""
+        result = WorkflowResult(True, "Test message", {}, 1, 1)
+        
+        with pytest.raises(FrozenInstanceError):
+            result.success = False
+        assert not hasattr(result, "__dict__")
+
+    def test_workflow_result_is_unhashable(self):
+        """Test that hashing a WorkflowResult fails up front rather than on its data dict."""
+        result = WorkflowResult(True, "Test message", {}, 1, 1)
+
+        assert WorkflowResult.__hash__ is None
+        with pytest.raises(TypeError, match="unhashable"):
+            hash(result)
+    
+    @pytest.mark.parametrize("clone", [
+        pytest.param(lambda r: pickle.loads(pickle.dumps(r)), id="pickle"),
+        pytest.param(copy.copy, id="copy"),
+        pytest.param(copy.deepcopy, id="deepcopy"),
+    ])
+    def test_workflow_result_round_trips(self, clone):
+        """Test that WorkflowResult survives pickling and copying despite being frozen and slotted."""
+        result = WorkflowResult(True, "Test message", {"key": ["value"]}, 2, 3)
+        
+        assert clone(result) == result
\ No newline at end of file